@@ -0,0 +1,35 @@
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+
+from backend.services import job_service
+
+router = APIRouter()
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    job = job_service.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{job_id}/events")
+async def job_events(job_id: str):
+    if await asyncio.to_thread(job_service.status, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last = None
+        while True:
+            job = await asyncio.to_thread(job_service.status, job_id)
+            payload = json.dumps(job)
+            if payload != last:
+                last = payload
+                yield f"data: {payload}\n\n"
+            if job["status"] in job_service.TERMINAL:
+                break
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -1,13 +1,15 @@
+import asyncio
+
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from typing import List
 
 from backend.services.upload_service import save_file
-from backend.services.pipeline_service import run as run_pipeline
+from backend.services import job_service
 
 router = APIRouter()
 
-@router.post("/{project_id}")
-def upload_files(
+@router.post("/{project_id}", status_code=202)
+async def upload_files(
     project_id: str,
     files: List[UploadFile] = File(...)
 ):
@@ -16,19 +18,18 @@ def upload_files(
 
     results = []
     for file in files:
-        results.append(save_file(project_id, file))
+        results.append(await save_file(project_id, file))
 
-    # Run pipeline AFTER successful upload
-    try:
-        pipeline_result = run_pipeline(project_id)
-    except Exception as e:
-        pipeline_result = {
-            "status": "pipeline_failed",
-            "error": str(e)
-        }
+    # Queue the pipeline AFTER successful upload; follow it on /jobs/{id}
+    job_id = await asyncio.to_thread(job_service.submit, project_id)
 
     return {
         "project_id": project_id,
         "uploaded": results,
-        "pipeline": pipeline_result
+        "job": {
+            "id": job_id,
+            "status": "queued",
+            "status_url": f"/jobs/{job_id}",
+            "events_url": f"/jobs/{job_id}/events"
+        }
     }
\ No newline at end of file
@@ -1,3 +1,4 @@
+import os
 from fastapi import FastAPI
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles
@@ -6,9 +7,15 @@ from pathlib import Path
 from backend.api.projects import router as projects_router
 from backend.api.uploads import router as uploads_router
 from backend.api.templates import router as templates_router
+from backend.api.jobs import router as jobs_router
+from backend.services import job_service, pipeline_service
+from backend.services.upload_service import UploadSizeLimit
 
 app = FastAPI(title="DMS")  # ✅ app must be defined BEFORE app.mount
 
+# Reject oversized uploads while they arrive, not after FastAPI parsed them
+app.add_middleware(UploadSizeLimit, prefix="/upload")
+
 ROOT = Path(__file__).resolve().parents[1]
 FRONTEND_DIR = ROOT / "frontend"
 INDEX_HTML = FRONTEND_DIR / "index.html"
@@ -16,10 +23,28 @@ INDEX_HTML = FRONTEND_DIR / "index.html"
 # serve /assets/logo.png
 app.mount("/assets", StaticFiles(directory=str(FRONTEND_DIR / "assets")), name="assets")
 
+@app.on_event("startup")
+def warm_up_embeddings():
+    # Opt-in: loads torch + the embedding model before the first RAG query
+    if os.environ.get("DMS_EMBEDDINGS_WARMUP") == "1":
+        from utils import embeddings
+        embeddings.warm_up()
+
+@app.on_event("startup")
+def warm_up_pipeline():
+    # Imports the stage modules on the pipeline worker before the first upload
+    pipeline_service.warm_up()
+
+@app.on_event("startup")
+def start_job_workers():
+    # Drains upload jobs in the background (including any left from a restart)
+    job_service.start_workers()
+
 @app.get("/")
 def home():
     return FileResponse(str(INDEX_HTML))
 
 app.include_router(projects_router)
 app.include_router(uploads_router, prefix="/upload")
-app.include_router(templates_router, prefix="/templates")
\ No newline at end of file
+app.include_router(templates_router, prefix="/templates")
+app.include_router(jobs_router, prefix="/jobs")
\ No newline at end of file
@@ -0,0 +1,152 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+from backend.services import pipeline_service
+
+DB_PATH = os.environ.get("DMS_JOBS_DB", "projects/jobs.db")
+WORKERS = int(os.environ.get("DMS_JOB_WORKERS", "1"))
+
+TERMINAL = {"completed", "failed"}
+
+
+class JobQueue:
+    """
+    Persistent queue of pipeline jobs (SQLite). Jobs survive restarts: any
+    job still marked running when the queue opens is put back as queued.
+
+    Job statuses: queued -> running -> completed | failed
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                project_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                stage TEXT,
+                stages TEXT NOT NULL DEFAULT '[]',
+                error TEXT,
+                created REAL NOT NULL,
+                started REAL,
+                finished REAL
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created)")
+        self._db.execute("UPDATE jobs SET status = 'queued', stage = NULL WHERE status = 'running'")
+        self._wake.set()  # jobs may already be waiting
+
+    def enqueue(self, project_id: str) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, project_id, status, created) VALUES (?, ?, 'queued', ?)",
+                (job_id, project_id, time.time()),
+            )
+        self._wake.set()
+        return job_id
+
+    def claim(self, timeout: float = 1.0):
+        """Mark the oldest queued job running and return it (None if the queue stays empty)."""
+        if not self._wake.wait(timeout):
+            return None
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, project_id FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row is None:
+                self._wake.clear()
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), row["id"])
+            )
+        return row["id"], row["project_id"]
+
+    def step(self, job_id: str, name: str, seconds):
+        with self._lock:
+            if seconds is None:
+                self._db.execute("UPDATE jobs SET stage = ? WHERE id = ?", (name, job_id))
+                return
+            stages = json.loads(
+                self._db.execute("SELECT stages FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+            )
+            stages.append({"name": name, "seconds": round(seconds, 3)})
+            self._db.execute("UPDATE jobs SET stages = ? WHERE id = ?", (json.dumps(stages), job_id))
+
+    def finish(self, job_id: str, error: str = None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, stage = NULL, error = ?, finished = ? WHERE id = ?",
+                ("completed" if error is None else "failed", error, time.time(), job_id),
+            )
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["stages"] = json.loads(job["stages"])
+        return job
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = JobQueue(DB_PATH)
+    return _queue
+
+
+def _work():
+    from utils import progress
+
+    queue = get_queue()
+    while True:
+        claimed = queue.claim()
+        if claimed is None:
+            continue
+        job_id, project_id = claimed
+        progress.reset(project_id)
+        try:
+            pipeline_service.run(project_id, on_step=lambda name, seconds: queue.step(job_id, name, seconds))
+            queue.finish(job_id)
+        except Exception as e:
+            # Some exceptions carry no message (TimeoutError()); never record ""
+            queue.finish(job_id, error=str(e) or repr(e))
+
+
+def start_workers(n: int = WORKERS):
+    """Start the background workers that drain the queue (jobs left from a previous run resume)."""
+    for i in range(n):
+        threading.Thread(target=_work, name=f"job-worker-{i}", daemon=True).start()
+
+
+def submit(project_id: str) -> str:
+    return get_queue().enqueue(project_id)
+
+
+def status(job_id: str) -> dict | None:
+    """Job row plus the tail of the project's live progress channel."""
+    from utils import progress
+
+    job = get_queue().get(job_id)
+    if job is not None:
+        job["progress"] = progress.tail(job["project_id"])
+    return job
@@ -1,17 +1,114 @@
+import importlib
+import os
 import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor
 
-def run(project_id: str):
-    steps = [
-        ("standardize_documents.py",),
-        ("extract_key_insights.py",),
-        ("generate_draft_memo_sections.py",),
-        ("generate_structure_overview.py",)
-    ]
-
-    for (script,) in steps:
-        subprocess.run(
-            ["python", f"scripts/{script}", "--project", project_id],
+# (module under scripts/, function) in run order
+STEPS = [
+    ("standardize_documents", "standardize_documents"),
+    ("extract_key_insights", "extract_key_insights"),
+    ("generate_draft_memo_sections", "generate_draft_memo_sections"),
+    ("generate_structure_overview", "generate_structure_overview"),
+]
+
+# "inprocess" (default): stage functions run on a long-lived worker that keeps
+# the imported libraries and LLM client warm between uploads.
+# "subprocess": one isolated interpreter per script, as a fallback.
+MODE = os.environ.get("DMS_PIPELINE_MODE", "inprocess")
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _load_steps():
+    return [getattr(importlib.import_module(f"scripts.{module}"), func) for module, func in STEPS]
+
+
+def _get_worker() -> ThreadPoolExecutor:
+    # A single thread: pipeline runs are serialised, as they were with blocking subprocesses
+    global _worker
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="pipeline", initializer=_load_steps
+                )
+    return _worker
+
+
+def _discard_worker(worker: ThreadPoolExecutor):
+    # A failed initializer (e.g. an import error in a stage module) breaks the
+    # pool for good; drop it so the next submit starts a fresh one
+    global _worker
+    with _worker_lock:
+        if _worker is worker:
+            _worker = None
+    worker.shutdown(wait=False)
+
+
+def _submit(fn, *args):
+    worker = _get_worker()
+    try:
+        return worker.submit(fn, *args)
+    except BrokenExecutor:
+        _discard_worker(worker)
+        return _get_worker().submit(fn, *args)
+
+
+def warm_up():
+    """Start the worker and import the stage modules in the background."""
+    if MODE == "inprocess":
+        # The worker thread (and its initializer) only starts on the first submit
+        _submit(lambda: None)
+
+
+def _timed(name, call, on_step):
+    if on_step:
+        on_step(name, None)
+    start = time.perf_counter()
+    call()
+    if on_step:
+        on_step(name, time.perf_counter() - start)
+
+
+def _run_inprocess(project_id: str, on_step=None):
+    for (module, _), step in zip(STEPS, _load_steps()):
+        _timed(module, lambda: step(project_id), on_step)
+
+
+def _run_subprocess(project_id: str, on_step=None):
+    for module, _ in STEPS:
+        _timed(module, lambda: subprocess.run(
+            [sys.executable, f"scripts/{module}.py", "--project", project_id],
             check=True
-        )
+        ), on_step)
+
+
+def run(project_id: str, mode: str = None, on_step=None):
+    """
+    Run the upload pipeline for a project.
+
+    Args:
+        project_id: Project folder under projects/
+        mode: "inprocess" or "subprocess" (defaults to DMS_PIPELINE_MODE)
+        on_step: Optional callback (step, seconds); called with seconds=None
+            when a step starts and with its duration when it finishes
+    """
+    mode = mode or MODE
+    if mode == "subprocess":
+        _run_subprocess(project_id, on_step)
+    elif mode == "inprocess":
+        worker = _get_worker()
+        try:
+            worker.submit(_run_inprocess, project_id, on_step).result()
+        except BrokenExecutor:
+            # The initializer failed while this run was queued: retry once on a new worker
+            _discard_worker(worker)
+            _submit(_run_inprocess, project_id, on_step).result()
+    else:
+        raise ValueError(f"Unknown pipeline mode: {mode}")
 
-    return {"status": "pipeline_completed"}
\ No newline at end of file
+    return {"status": "pipeline_completed", "mode": mode}
@@ -1,10 +1,68 @@
+import asyncio
+import hashlib
 import os
+import uuid
 from fastapi import UploadFile, HTTPException
+from fastapi.responses import JSONResponse
+
+from utils import blobstore
 
 ALLOWED_EXTENSIONS = {".pdf", ".docx", ".xlsx", ".pptx"}
 MAX_FILE_SIZE_MB = 20
+CHUNK_SIZE = 1024 * 1024
+
+# Whole upload request (every file plus multipart framing); enforced by
+# UploadSizeLimit while the body is received, before it is parsed
+MAX_REQUEST_SIZE_MB = int(os.environ.get("DMS_MAX_UPLOAD_REQUEST_MB", "100"))
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware capping the body of upload requests.
+
+    FastAPI parses (and spools) the whole multipart body before the endpoint
+    runs, so save_file's per-file check only fires once everything has been
+    received. This rejects a request with 413 up front when its
+    Content-Length is over the cap, and stops reading a body without one
+    (chunked) as soon as the cap is passed.
+    """
+
+    def __init__(self, app, prefix: str = "/upload", max_bytes: int = MAX_REQUEST_SIZE_MB * 1024 * 1024):
+        self.app = app
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+
+        length = dict(scope["headers"]).get(b"content-length", b"")
+        if length.isdigit() and int(length) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail=self._detail())
+            return message
 
-def save_file(project_id: str, file: UploadFile):
+        await self.app(scope, limited_receive, send)
+
+    def _detail(self) -> str:
+        return f"Upload too large (over {self.max_bytes // (1024 * 1024)}MB per request)"
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse({"detail": self._detail()}, status_code=413, headers={"Connection": "close"})
+        await response(scope, receive, send)
+
+async def save_file(project_id: str, file: UploadFile):
     base = f"projects/{project_id}"
 
     # 1️⃣ Project exists
@@ -12,34 +70,51 @@ def save_file(project_id: str, file: UploadFile):
         raise HTTPException(status_code=404, detail="Project not found")
 
     # 2️⃣ Extension check
-    _, ext = os.path.splitext(file.filename.lower())
+    filename = os.path.basename(file.filename)
+    _, ext = os.path.splitext(filename.lower())
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail=f"Invalid file type: {ext}"
         )
 
-    # 3️⃣ Size check
-    file.file.seek(0, os.SEEK_END)
-    size_mb = file.file.tell() / (1024 * 1024)
-    file.file.seek(0)
-
-    if size_mb > MAX_FILE_SIZE_MB:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File too large ({size_mb:.1f}MB)"
-        )
-
-    # 4️⃣ Save
+    # 3️⃣ Copy to a temporary file in fixed-size chunks, enforcing the size
+    # limit and hashing on the way (never the whole file in memory). The
+    # request has already been received by now; UploadSizeLimit is what
+    # stops oversized uploads while they arrive
     raw = f"{base}/raw_docs"
     os.makedirs(raw, exist_ok=True)
 
-    path = f"{raw}/{file.filename}"
-    with open(path, "wb") as f:
-        f.write(file.file.read())
+    incoming = blobstore.BLOB_DIR / "incoming"
+    incoming.mkdir(parents=True, exist_ok=True)
+    tmp = f"{incoming}/{uuid.uuid4().hex}.part"
+    limit = MAX_FILE_SIZE_MB * 1024 * 1024
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(tmp, "wb") as f:
+            while chunk := await file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > limit:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large (over {MAX_FILE_SIZE_MB}MB)"
+                    )
+                digest.update(chunk)
+                await asyncio.to_thread(f.write, chunk)
+
+        # 4️⃣ Store once by content, then link into raw_docs atomically
+        # (readers never see a partial file; identical uploads share storage)
+        blobstore.adopt(tmp, digest.hexdigest())
+        blobstore.link(digest.hexdigest(), f"{raw}/{filename}")
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
 
     return {
-        "filename": file.filename,
-        "size_mb": round(size_mb, 2),
+        "filename": filename,
+        "size_mb": round(size / (1024 * 1024), 2),
+        "sha256": digest.hexdigest(),
         "status": "uploaded"
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,67 @@
+# bench_chunker.py — single-pass chunker vs. the former slicing loop
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import argparse
+import random
+import time
+
+from utils.chunker import chunk_text
+
+
+def legacy_chunk_text(text: str, max_chars: int = 3000):
+    """Previous implementation: copies the remainder on every cut."""
+    chunks = []
+    while len(text) > max_chars:
+        split = text.rfind("\n", 0, max_chars)
+        if split <= 0:
+            split = max_chars
+        chunks.append(text[:split])
+        text = text[split:]
+    chunks.append(text)
+    return chunks
+
+
+def synthetic_markdown(size_bytes: int, seed: int = 0) -> str:
+    """Standardized-markdown-like text: headings, paragraphs, bullets (FR/EN)."""
+    rng = random.Random(seed)
+    words = (
+        "market marché revenue croissance regulation licence supply production "
+        "risk risque margin coût distribution demand investors projet"
+    ).split()
+    parts, size = ["# Source: synthetic.pdf\n\n"], 0
+    while size < size_bytes:
+        if rng.random() < 0.05:
+            block = f"## Section {len(parts)}\n"
+        elif rng.random() < 0.3:
+            block = "\n".join(f"- {' '.join(rng.choices(words, k=12))}" for _ in range(4)) + "\n\n"
+        else:
+            block = " ".join(rng.choices(words, k=rng.randint(40, 160))) + ".\n\n"
+        parts.append(block)
+        size += len(block)
+    return "".join(parts)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark utils.chunker on large inputs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 2, 4, 8], help='Input sizes in MB')
+    parser.add_argument('--max-chars', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(f"{'MB':>4} {'legacy s':>10} {'single-pass s':>14} {'speedup':>8} {'chunks':>8}")
+    for mb in args.sizes:
+        text = synthetic_markdown(mb * 1024 * 1024)
+        legacy_s, _ = timed(legacy_chunk_text, text, args.max_chars)
+        new_s, chunks = timed(chunk_text, text, args.max_chars)
+        print(f"{mb:>4} {legacy_s:>10.3f} {new_s:>14.3f} {legacy_s / new_s:>7.1f}x {len(chunks):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# bench_extraction.py — standardization throughput per format on synthetic files
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import argparse
+import tempfile
+import time
+
+from docx import Document
+from openpyxl import Workbook
+from pptx import Presentation
+from pptx.util import Inches
+
+from scripts.benchmarks.check_extraction_memory import write_synthetic_pdf
+from scripts.standardize_documents import extract_to
+
+LINE = "Revenue growth of {} percent driven by market demand and regulatory approval"
+
+
+def write_docx(path: Path, units: int):
+    doc = Document()
+    for i in range(units):
+        doc.add_paragraph(LINE.format(i))
+    doc.save(path)
+
+
+def write_xlsx(path: Path, units: int):
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Model")
+    ws.append(["Year", "Revenue", "Costs", "Margin", "Comment"])
+    for i in range(units):
+        ws.append([2000 + i % 50, 1000.5 * i, 700.25 * i, 0.3, LINE.format(i)])
+    wb.save(path)
+
+
+def write_pptx(path: Path, units: int):
+    prs = Presentation()
+    layout = prs.slide_layouts[1]   # title and content
+    for i in range(units):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {i}"
+        body = slide.placeholders[1].text_frame
+        body.text = LINE.format(i)
+        for j in range(4):
+            body.add_paragraph().text = LINE.format(j)
+        rows = slide.shapes.add_table(3, 3, Inches(1), Inches(4), Inches(6), Inches(1)).table
+        for r in range(3):
+            for c in range(3):
+                rows.cell(r, c).text = f"{r}.{c}"
+    prs.save(path)
+
+
+# format -> (writer, unit name)
+FORMATS = {
+    "pdf": (write_synthetic_pdf, "pages"),
+    "docx": (write_docx, "paragraphs"),
+    "xlsx": (write_xlsx, "rows"),
+    "pptx": (write_pptx, "slides"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text extraction per format")
+    parser.add_argument('--formats', nargs='+', choices=sorted(FORMATS), default=sorted(FORMATS))
+    parser.add_argument('--units', type=int, nargs='+', default=[100, 1000],
+                        help='Pages / paragraphs / rows / slides per synthetic file')
+    args = parser.parse_args()
+
+    print(f"{'format':>6} {'units':>7} {'file MB':>8} {'seconds':>8} {'MB/s':>7} {'units/s':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        for fmt in args.formats:
+            writer, unit = FORMATS[fmt]
+            for units in args.units:
+                src = tmp / f"synthetic-{units}.{fmt}"
+                writer(src, units)
+                start = time.perf_counter()
+                extract_to(src, tmp / "out.md")
+                seconds = time.perf_counter() - start
+                mb = src.stat().st_size / 1e6
+                print(f"{fmt:>6} {units:>7} {mb:>8.2f} {seconds:>8.2f} {mb / seconds:>7.2f} {units / seconds:>9.0f}  ({unit})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# bench_insights.py — compiled keyword classifier vs. the former per-category substring scans
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import argparse
+import random
+import re
+import time
+
+from scripts.extract_key_insights import KEYWORDS, MIN_BLOCK_CHARS, score_block
+
+FILLER = (
+    "the of and to in for with on by la le les des du et en pour avec sur par company société "
+    "project projet year année team équipe plan client service données report rapport business "
+    "entreprise partners partenaires value valeur strategy stratégie development développement "
+    "quality qualité investors actionnaires board conseil"
+).split()
+
+SAMPLE_KEYWORDS = [w for words in KEYWORDS.values() for w in words]
+
+
+def synthetic_document(size_bytes: int, keyword_rate: float = 0.03, seed: int = 0) -> str:
+    """FR/EN paragraphs with a sprinkling of category keywords (some capitalised, some inflected)."""
+    rng = random.Random(seed)
+    parts, size = ["# Source: synthetic.pdf\n\n"], 0
+    while size < size_bytes:
+        words = []
+        for _ in range(rng.randint(20, 160)):
+            if rng.random() < keyword_rate:
+                w = rng.choice(SAMPLE_KEYWORDS) + rng.choice(["", "s", "e", "ing"])
+                words.append(w.capitalize() if rng.random() < 0.2 else w)
+            else:
+                words.append(rng.choice(FILLER))
+        block = " ".join(words) + ".\n\n"
+        parts.append(block)
+        size += len(block)
+    return "".join(parts)
+
+
+def blocks_of(text: str):
+    return [b.strip() for b in re.split(r"\n{2,}", text) if len(b.strip()) > MIN_BLOCK_CHARS]
+
+
+def legacy_first_five(blocks):
+    """Previous behaviour: first matching category per block, stop after five."""
+    found = []
+    for block in blocks:
+        block_lower = block.lower()
+        for category, words in KEYWORDS.items():
+            if any(w in block_lower for w in words):
+                found.append(category)
+                break
+        if len(found) >= 5:
+            break
+    return found
+
+
+def legacy_score_all(blocks):
+    """
+    The previous scans extended to rank every block: one substring count per
+    keyword (so "cost" also counts inside "costume", unlike score_block).
+    """
+    scores = []
+    for block in blocks:
+        block_lower = block.lower()
+        counts = {c: sum(block_lower.count(w) for w in words) for c, words in KEYWORDS.items()}
+        hits = sum(counts.values())
+        scores.append((max(counts, key=counts.get), hits / len(block.split())) if hits else (None, 0.0))
+    return scores
+
+
+def compiled_score_all(blocks):
+    return [score_block(block) for block in blocks]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark insight keyword scoring on large documents")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 4, 16], help='Document sizes in MB')
+    parser.add_argument('--keyword-rate', type=float, default=0.03, help='Share of words that are keywords')
+    args = parser.parse_args()
+
+    print(f"{'MB':>4} {'blocks':>7} {'first-5 s':>10} {'scan-all s':>11} {'compiled s':>11} {'speedup':>8}")
+    for mb in args.sizes:
+        blocks = blocks_of(synthetic_document(mb * 1024 * 1024, args.keyword_rate))
+        first5 = timed(legacy_first_five, blocks)
+        legacy = timed(legacy_score_all, blocks)
+        compiled = timed(compiled_score_all, blocks)
+        print(f"{mb:>4} {len(blocks):>7} {first5:>10.3f} {legacy:>11.3f} {compiled:>11.3f} {legacy / compiled:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
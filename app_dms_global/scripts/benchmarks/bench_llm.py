@@ -0,0 +1,39 @@
+# bench_llm.py — batch_ask throughput against the deterministic latency-model backend
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import argparse
+import time
+
+from utils.llm import LLMClient
+from utils.llm_backends import LatencyModelBackend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM batching offline")
+    parser.add_argument('--prompts', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--ttft', type=float, default=0.4, help='Simulated time to first token (s)')
+    parser.add_argument('--per-token', type=float, default=0.005, help='Simulated seconds per output token')
+    parser.add_argument('--server-rpm', type=float, help='Simulated provider requests/minute')
+    parser.add_argument('--rpm', type=float, help='Client-side requests/minute budget')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    prompts = [f"Assess the market and risk profile of opportunity #{i}" for i in range(args.prompts)]
+
+    print(f"{'concurrency':>11} {'wall s':>8} {'prompts/s':>10}")
+    for concurrency in args.concurrency:
+        backend = LatencyModelBackend(
+            seed=args.seed, ttft=args.ttft, per_token=args.per_token, rpm=args.server_rpm
+        )
+        client = LLMClient(backend, cache=False, concurrency=concurrency, rpm=args.rpm)
+        start = time.perf_counter()
+        client.batch_ask(prompts)
+        wall = time.perf_counter() - start
+        print(f"{concurrency:>11} {wall:>8.2f} {len(prompts) / wall:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench_pipeline_service.py — upload pipeline latency: in-process worker vs one subprocess per script
+#
+# Run from app_dms_global/ (the backend's working directory) against an
+# existing project with documents in raw_docs/:
+#   python scripts/benchmarks/bench_pipeline_service.py --project <project_id>
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import argparse
+import shutil
+import statistics
+import time
+
+from backend.services import pipeline_service
+from scripts.maintenance import clear_llm_cache
+from utils import blobstore
+
+
+def reset_caches(project: str):
+    """Drop every cache the pipeline stages reuse, so each run does the full work."""
+    # Stage modules are not imported here: that would warm the in-process worker
+    base = Path(f"projects/{project}")
+    (base / "standardized" / "manifest.json").unlink(missing_ok=True)
+    for raw in (base / "raw_docs").iterdir():
+        if raw.is_file():
+            for cached in blobstore.derived_path(blobstore.file_digest(raw), "").glob("standardized-v*.txt"):
+                cached.unlink()
+    shutil.rmtree(base / "insights" / "cache", ignore_errors=True)
+    clear_llm_cache()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline_service modes")
+    parser.add_argument('--project', required=True)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--modes', nargs='+', default=["subprocess", "inprocess"])
+    args = parser.parse_args()
+
+    if not Path(f"projects/{args.project}/raw_docs").is_dir():
+        print(f"❌ projects/{args.project}/raw_docs not found (run from app_dms_global/)")
+        sys.exit(1)
+
+    print(f"{'mode':>10} {'first s':>8} {'median s':>9}")
+    for mode in args.modes:
+        timings = []
+        for _ in range(args.runs):
+            # Otherwise the second mode (and every run after the first)
+            # would only time cache hits
+            reset_caches(args.project)
+            start = time.perf_counter()
+            pipeline_service.run(args.project, mode=mode)
+            timings.append(time.perf_counter() - start)
+        # "first" includes the in-process worker's cold imports; caches are
+        # reset before every run
+        print(f"{mode:>10} {timings[0]:>8.2f} {statistics.median(timings):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
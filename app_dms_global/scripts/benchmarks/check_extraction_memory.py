@@ -0,0 +1,112 @@
+# check_extraction_memory.py — peak-RSS regression check for PDF standardization
+#
+# Extracts a synthetic small and large PDF in fresh interpreters and fails
+# (exit 1) if peak memory grows with page count by more than the budget:
+# the streaming extractor should stay flat however long the document is.
+# Run with --legacy to confirm the check catches the former extractor,
+# which joined the text of every page in memory.
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import argparse
+import subprocess
+import tempfile
+
+MEASURE = """
+import resource, sys
+from pathlib import Path
+sys.path.append({root!r})
+from scripts.standardize_documents import extract_to
+extract_to(Path({pdf!r}), Path({out!r}))
+# KiB on Linux, bytes on macOS
+scale = 1 if sys.platform == "darwin" else 1024
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale)
+"""
+
+# The extractor before streaming, kept to calibrate the budget
+MEASURE_LEGACY = """
+import resource, sys
+from pathlib import Path
+from pypdf import PdfReader
+reader = PdfReader({pdf!r})
+text = "\\n".join(page.extract_text() or "" for page in reader.pages)
+Path({out!r}).write_text(f"# Source: {{Path({pdf!r}).name}}\\n\\n{{text}}", encoding="utf-8")
+scale = 1 if sys.platform == "darwin" else 1024
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale)
+"""
+
+
+def write_synthetic_pdf(path: Path, pages: int, lines_per_page: int = 45):
+    """Minimal valid PDF: one Helvetica text page per page, uncompressed."""
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once the page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    kids = []
+    for n in range(pages):
+        lines = [f"({'Page %d line %d: revenue growth and market risk overview' % (n + 1, i)}) Tj T*"
+                 for i in range(lines_per_page)]
+        stream = ("BT /F1 10 Tf 14 TL 50 780 Td " + " ".join(lines) + " ET").encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (len(objects))
+        )
+        kids.append(len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % k for k in kids), pages
+    )
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (i, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % o for o in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(out))
+
+
+def peak_rss(pdf: Path, out: Path, legacy: bool = False) -> int:
+    root = str(Path(__file__).resolve().parents[2])
+    script = MEASURE_LEGACY if legacy else MEASURE
+    result = subprocess.run(
+        [sys.executable, "-c", script.format(root=root, pdf=str(pdf), out=str(out))],
+        capture_output=True, text=True, check=True,
+    )
+    return int(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that PDF extraction memory stays flat")
+    parser.add_argument('--small', type=int, default=50, help='Pages in the baseline PDF')
+    parser.add_argument('--large', type=int, default=2000, help='Pages in the large PDF')
+    parser.add_argument('--lines', type=int, default=90, help='Text lines per page')
+    parser.add_argument('--budget-mb', type=float, default=35, help='Allowed peak-RSS growth')
+    parser.add_argument('--legacy', action='store_true', help='Measure the former join-everything extractor')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        rss = {}
+        for pages in (args.small, args.large):
+            pdf = tmp / f"synthetic-{pages}.pdf"
+            write_synthetic_pdf(pdf, pages, args.lines)
+            rss[pages] = peak_rss(pdf, tmp / f"synthetic-{pages}.md", args.legacy)
+            size_mb = pdf.stat().st_size / 1e6
+            print(f"{pages:>6} pages ({size_mb:.1f} MB): peak RSS {rss[pages] / 2**20:.0f} MB")
+
+    growth = (rss[args.large] - rss[args.small]) / 2**20
+    print(f"Growth: {growth:.0f} MB (budget {args.budget_mb:.0f} MB)")
+    if growth > args.budget_mb:
+        print("❌ Peak memory grows with page count")
+        sys.exit(1)
+    print("✅ Extraction memory is flat")
+
+
+if __name__ == "__main__":
+    main()
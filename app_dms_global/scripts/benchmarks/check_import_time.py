@@ -0,0 +1,44 @@
+# check_import_time.py — import-time budget for the pipeline module
+#
+# callbacks.py imports the pipeline when the app starts, so importing it must
+# stay cheap. Measured in a fresh interpreter; exits 1 when over budget.
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[3]
+
+MEASURE = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def import_seconds(module: str) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", MEASURE.format(module=module)],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the pipeline import-time budget")
+    parser.add_argument('--module', default='app_dms_global.scripts.pipeline')
+    parser.add_argument('--budget', type=float, default=0.5, help='Seconds allowed')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    best = min(import_seconds(args.module) for _ in range(args.runs))
+    print(f"{args.module}: {best * 1000:.0f} ms (budget {args.budget * 1000:.0f} ms)")
+    if best > args.budget:
+        print("❌ Import-time budget exceeded")
+        sys.exit(1)
+    print("✅ Within budget")
+
+
+if __name__ == "__main__":
+    main()
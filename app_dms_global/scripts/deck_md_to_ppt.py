@@ -6,9 +6,10 @@ from datetime import datetime
 from pptx import Presentation
 from pptx.util import Inches
 
-# Ensure we can import the LLM util
-sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
-from app_dms_global.utils.llm import ask
+# Ensure we can import the LLM util (same module as the other scripts: one shared client)
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.llm import ask_streaming
+from utils import insights_store
 
 def parse_slides_from_markdown(md: str):
     """
@@ -56,35 +57,28 @@ def clean_slides(slides):
         out.append((title, body))
     return out
 
-def load_insight_bullets(insights_path: Path):
+def load_insight_bullets(project_name, limit=3):
     """
-    Return up to 3 bullets from key_insights.md
+    Return up to `limit` bullets from the project's best-scored insights
     """
-    if not insights_path.exists():
-        return []
     bullets = []
-    for line in insights_path.read_text(encoding="utf-8").splitlines():
-        l = line.strip()
-        if l.startswith(("- ", "• ")):
-            bullets.append(l.lstrip("-• ").strip())
-            if len(bullets) >= 3:
-                break
+    for insight in insights_store.query(project_name, limit=limit):
+        excerpt = " ".join(insight.excerpt.split())
+        sentence = re.split(r"(?<=[.!?])\s", excerpt, maxsplit=1)[0]
+        if len(sentence) > 160:
+            sentence = sentence[:157].rstrip() + "..."
+        bullets.append(f"{insight.type}: {sentence}")
     return bullets
 
-def parse_insight_sources(insights_path: Path):
+def parse_insight_sources(project_name):
     """
-    Return sorted list of unique filenames from 'Source: xxx.md' lines.
+    Return sorted list of unique source documents of the project's insights.
     """
-    if not insights_path.exists():
-        return []
-    text = insights_path.read_text(encoding="utf-8")
-    sources = re.findall(r"Source:\s*([^\n]+\.md)", text)
-    return sorted(set(sources))
+    return insights_store.sources(project_name)
 
 def deck_md_to_ppt(project_name, audience="investors", sector=None, territory=None):
     BASE = Path(f"projects/{project_name}")
     MD   = BASE / "deck/deck.md"
-    INS  = BASE / "insights/key_insights.md"
     CHART= BASE / "financial/charts/revenue.png"
     OUT  = Path(f"outputs/{project_name}-{audience}.pptx")
     OUT.parent.mkdir(parents=True, exist_ok=True)
@@ -135,7 +129,7 @@ def deck_md_to_ppt(project_name, audience="investors", sector=None, territory=No
             sentence = next((l.strip() for l in body if l.strip() and not l.startswith("#")), None)
             if not sentence and sector and territory:
                 prompt = f"Write a one-sentence project overview for a {sector} project in {territory}."
-                sentence = ask(prompt)
+                sentence = ask_streaming(prompt, channel=project_name)
             if sentence:
                 for ph in slide.placeholders:
                     if ph.has_text_frame and ph != slide.shapes.title:
@@ -150,7 +144,7 @@ def deck_md_to_ppt(project_name, audience="investors", sector=None, territory=No
             if sector:    exec_bullets.append(f"Sector: {sector}")
             if territory: exec_bullets.append(f"Territory: {territory}")
             exec_bullets.append(f"Date: {today}")
-            exec_bullets += load_insight_bullets(INS)
+            exec_bullets += load_insight_bullets(project_name)
             for ph in slide.placeholders:
                 if ph.has_text_frame and ph != slide.shapes.title:
                     ph.text = "\n".join(f"• {b}" for b in exec_bullets)
@@ -173,7 +167,7 @@ def deck_md_to_ppt(project_name, audience="investors", sector=None, territory=No
         print(f"  ✓ Slide {idx+1}: {title}")
 
     # Appendix — Sources
-    sources = parse_insight_sources(INS)
+    sources = parse_insight_sources(project_name)
     if sources:
         slide = prs.slides.add_slide(L_CONTENT)
         if slide.shapes.title:
@@ -4,85 +4,221 @@
 import sys
 from pathlib import Path
 import argparse
+import hashlib
+import json
+import multiprocessing
+import os
 import re
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
+from utils.blobstore import file_digest
+from utils.insights_store import Insight, InsightStore, store_path
 
 
 # ============================================================
 # STRICT DETERMINISTIC INSIGHT EXTRACTOR
 # ============================================================
 
-def extract_insights_deterministic(text: str, doc_name: str) -> list[str]:
+KEYWORDS = {
+    "Market": [
+        "market", "marché", "demand", "demande", "competition", "concurr",
+        "growth", "croissance"
+    ],
+    "Regulation": [
+        "regulation", "réglement", "law", "loi", "autorité", "authority",
+        "compliance", "licence", "approval"
+    ],
+    "Operations": [
+        "operation", "process", "manufactur", "supply", "production",
+        "distribution", "logistics"
+    ],
+    "Financial": [
+        "revenue", "cost", "margin", "profit", "expense",
+        "chiffre", "coût", "rentabilité"
+    ],
+    "Risk": [
+        "risk", "risque", "challenge", "threat", "uncertainty",
+        "contraint", "exposure"
+    ],
+}
+
+KEYWORD_CATEGORY = {w: category for category, words in KEYWORDS.items() for w in words}
+
+# Keywords matched as the start of any word ("concurr" -> "concurrence",
+# "profit" -> "profitability"); every other keyword must be a whole word,
+# optionally plural ("cost"/"costs", not "costume"; "loi", not "loin")
+STEMS = {"concurr", "réglement", "manufactur", "contraint", "operation", "profit"}
+
+MAX_INSIGHTS = 5
+MIN_BLOCK_CHARS = 120
+
+
+def _keyword_pattern(words) -> str:
+    """
+    One regex over all keywords, factored as a prefix trie
+    ("demand", "demande" -> "demand(?:e)?") so each position of the text is
+    tried against the shared prefixes once rather than against every word.
+    """
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        alts = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        if "" in node:
+            return "(?:" + "|".join(alts) + ")?"
+        return alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+
+    return build(trie)
+
+
+# One pass over lowercased text; matches are the keywords themselves (a
+# plural ending is checked by the lookahead, not consumed)
+KEYWORD_RE = re.compile(
+    r"\b(?:" + _keyword_pattern(STEMS)
+    + r"|" + _keyword_pattern(set(KEYWORD_CATEGORY) - STEMS) + r"(?=(?:e?s)?\b))"
+)
+
+
+def score_block(block: str):
+    """
+    Score a block against every category in one scan.
+    Returns (dominant category or None, keywords per word).
+    """
+    found = KEYWORD_RE.findall(block.lower())
+    if not found:
+        return None, 0.0
+    counts = dict.fromkeys(KEYWORDS, 0)
+    for keyword in found:
+        counts[KEYWORD_CATEGORY[keyword]] += 1
+    # Ties go to the earlier category, as in the original priority order
+    return max(counts, key=counts.get), len(found) / len(block.split())
+
+
+def _blocks(text: str):
+    """Yield (offset, block) for each paragraph / bullet group of the text."""
+    start = 0
+    for sep in re.finditer(r"\n{2,}", text):
+        yield start, text[start:sep.start()]
+        start = sep.end()
+    yield start, text[start:]
+
+
+def extract_insight_records(text: str, doc_name: str) -> list[Insight]:
     """
     Strict, extractive insight extraction.
     - No LLM
     - No hallucination possible
     - Works with Markdown, bullets, FR/EN
-    """
 
-    insights = []
-
-    # Split document into meaningful blocks (paragraphs / bullet groups)
-    blocks = [
-        b.strip()
-        for b in re.split(r"\n{2,}", text)
-        if len(b.strip()) > 120
+    Every block is scored; the MAX_INSIGHTS blocks with the highest
+    keyword density are kept, best first, with their offsets in `text`.
+    """
+    scored = []
+    for offset, raw in _blocks(text):
+        block = raw.strip()
+        if len(block) <= MIN_BLOCK_CHARS:
+            continue
+        category, density = score_block(block)
+        if category:
+            start = offset + len(raw) - len(raw.lstrip())
+            scored.append((-density, start, category, block))
+    scored.sort()
+
+    return [
+        Insight(type=category, source=doc_name, excerpt=block[:500],
+                start=start, end=start + len(block), score=-neg_density)
+        for neg_density, start, category, block in scored[:MAX_INSIGHTS]
     ]
 
-    KEYWORDS = {
-        "Market": [
-            "market", "marché", "demand", "demande", "competition", "concurr",
-            "growth", "croissance"
-        ],
-        "Regulation": [
-            "regulation", "réglement", "law", "loi", "autorité", "authority",
-            "compliance", "licence", "approval", "approval"
-        ],
-        "Operations": [
-            "operation", "process", "manufactur", "supply", "production",
-            "distribution", "logistics"
-        ],
-        "Financial": [
-            "revenue", "cost", "margin", "profit", "expense",
-            "chiffre", "coût", "rentabilité"
-        ],
-        "Risk": [
-            "risk", "risque", "challenge", "threat", "uncertainty",
-            "contraint", "exposure"
-        ],
-    }
-
-    for block in blocks:
-        block_lower = block.lower()
-
-        for insight_type, words in KEYWORDS.items():
-            if any(w in block_lower for w in words):
-                insights.append(
-                    f"""### Insight
-Type: {insight_type}
-Source: {doc_name}
-Excerpt: "{block[:500].replace('"', "'")}"
-Implication: Indicates {insight_type.lower()} relevance based on source document.
-"""
-                )
-                break
-
-        if len(insights) >= 5:
-            break
-
-    return insights
+
+def extract_insights_deterministic(text: str, doc_name: str) -> list[str]:
+    """Insights of `text` rendered as key_insights.md sections."""
+    return [insight.to_markdown() for insight in extract_insight_records(text, doc_name)]
 
 
 # ============================================================
 # MAIN EXTRACTION PIPELINE
 # ============================================================
 
-def extract_key_insights(project_name: str):
+MIN_DOC_CHARS = 300
+
+# Part of the cache key: bump when extraction output changes
+INSIGHTS_VERSION = 4
+
+# Below this much uncached markdown, a process pool costs more than it saves
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
+
+
+def extract_document(doc: Path):
+    """
+    Insights for one standardized document.
+    Returns (insight records, diagnostic); diagnostic is None on success.
+    """
+    text = doc.read_text(encoding="utf-8")
+    length = len(text.strip())
+
+    if length < MIN_DOC_CHARS:
+        return [], f"Document '{doc.name}' is too short for investment analysis ({length} chars)."
+
+    insights = extract_insight_records(text, doc.name)
+    if not insights:
+        return [], (
+            f"No investment-relevant content found in '{doc.name}'. "
+            "Document is not suitable for investor-grade analysis."
+        )
+    return insights, None
+
+
+def _extract_file(path: str):
+    """Pool worker wrapper (picklable arguments only)."""
+    return extract_document(Path(path))
+
+
+def _doc_key(doc: Path, hashes: dict) -> str:
+    """
+    Cache key of a document: version, name and content hash. The content
+    is only re-hashed when its size or mtime differ from `hashes`, the
+    {name: {size, mtime_ns, sha256}} record of the last run (updated here).
+    """
+    st = doc.stat()
+    entry = hashes.get(doc.name)
+    if not (entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns):
+        entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": file_digest(doc)}
+        hashes[doc.name] = entry
+    return hashlib.sha256(f"{INSIGHTS_VERSION}\0{doc.name}\0{entry['sha256']}".encode("utf-8")).hexdigest()
+
+
+def extract_key_insights(project_name: str, workers=None):
+    """
+    Extract insights from every standardized document of a project.
+
+    Documents are processed independently: results are cached per document
+    (by markdown hash, recomputed only when a file's size or mtime changed)
+    and uncached documents are spread over a process pool when there is
+    enough text to make it worthwhile. A document that is too
+    short or has no relevant content is recorded in insights/diagnostics.json
+    instead of aborting; the stage only fails when no document yields insights.
+
+    Records go to the project's InsightStore (insights/insights.db), from
+    which insights/key_insights.md is rendered.
+
+    Args:
+        project_name: The project identifier/name
+        workers: Pool size (default: the CPU count)
+    """
     BASE = Path(f"projects/{project_name}")
     DOCS = BASE / "standardized/docs"
     OUT = BASE / "insights/key_insights.md"
-    OUT.parent.mkdir(parents=True, exist_ok=True)
+    CACHE = BASE / "insights/cache"
+    DIAGNOSTICS = BASE / "insights/diagnostics.json"
+    HASHES = BASE / "insights/documents.json"
+    CACHE.mkdir(parents=True, exist_ok=True)
 
     print(f"🔍 Extracting STRICT GROUNDED insights for: {project_name}")
     print(f"   Documents directory: {DOCS}")
@@ -90,42 +226,86 @@ def extract_key_insights(project_name: str):
     if not DOCS.exists():
         raise RuntimeError("No standardized documents found. Aborting.")
 
-    doc_files = list(DOCS.glob("*.md"))
+    doc_files = sorted(DOCS.glob("*.md"))
 
     if not doc_files:
         raise RuntimeError("No markdown documents found. Aborting.")
 
-    all_insights = ["# Key Insights\n"]
+    previous = json.loads(HASHES.read_text(encoding="utf-8")) if HASHES.exists() else {}
+    hashes = {name: entry for name, entry in previous.items() if (DOCS / name).exists()}
+    keys = {doc: _doc_key(doc, hashes) for doc in doc_files}
+    if hashes != previous:
+        HASHES.write_text(json.dumps(hashes, indent=2), encoding="utf-8")
+    results = {}
+    for doc, key in keys.items():
+        cached = CACHE / f"{key}.json"
+        if cached.exists():
+            entry = json.loads(cached.read_text(encoding="utf-8"))
+            results[doc] = ([Insight.from_dict(i) for i in entry["insights"]], entry["diagnostic"])
+
+    todo = [doc for doc in doc_files if doc not in results]
+    if todo:
+        size = sum(doc.stat().st_size for doc in todo)
+        if len(todo) > 1 and size >= PARALLEL_MIN_BYTES:
+            n = min(workers or os.cpu_count() or 1, len(todo))
+            # spawn: the pipeline calls this from worker threads, where fork is unsafe
+            with multiprocessing.get_context("spawn").Pool(n) as pool:
+                extracted = pool.map(_extract_file, [str(doc) for doc in todo])
+        else:
+            extracted = [extract_document(doc) for doc in todo]
+
+        for doc, (insights, diagnostic) in zip(todo, extracted):
+            results[doc] = (insights, diagnostic)
+            (CACHE / f"{keys[doc]}.json").write_text(
+                json.dumps({
+                    "document": doc.name,
+                    "insights": [i.to_dict() for i in insights],
+                    "diagnostic": diagnostic,
+                }),
+                encoding="utf-8"
+            )
 
-    for doc in doc_files:
-        print(f"   📄 Processing: {doc.name}")
+    # Drop cache entries of documents that changed or disappeared
+    live = {f"{key}.json" for key in keys.values()}
+    for stale in CACHE.glob("*.json"):
+        if stale.name not in live:
+            stale.unlink()
 
-        text = doc.read_text(encoding="utf-8").strip()
-        print(f"   🧪 DEBUG: text length = {len(text)}")
+    all_insights = []
+    diagnostics = []
 
-        if len(text) < 300:
-            raise RuntimeError(
-                f"Document '{doc.name}' is too short for investment analysis."
-            )
+    for doc in doc_files:
+        insights, diagnostic = results[doc]
+        if diagnostic:
+            print(f"   ⚠️ {diagnostic}")
+            diagnostics.append({"document": doc.name, "problem": diagnostic})
+            continue
 
-        insights = extract_insights_deterministic(text, doc.name)
-        print(f"   🧪 DEBUG: extracted {len(insights)} insights")
+        all_insights.extend(insights)
 
-        if not insights:
-            raise RuntimeError(
-                f"No investment-relevant content found in '{doc.name}'. "
-                "Document is not suitable for investor-grade analysis."
-            )
+        print(f"   ✅ {len(insights)} extractive insights from {doc.name}")
 
-        all_insights.append(f"\n## From {doc.name}\n")
-        all_insights.extend(insights)
+    DIAGNOSTICS.write_text(json.dumps(diagnostics, indent=2), encoding="utf-8")
 
-        print(f"   ✅ Extractive insights generated from {doc.name}")
+    if len(diagnostics) == len(doc_files):
+        raise RuntimeError(
+            "No document is suitable for investor-grade analysis: "
+            + " ".join(d["problem"] for d in diagnostics)
+        )
 
-    final_output = "\n".join(all_insights)
+    # The store is the source of truth; key_insights.md is rendered from it
+    store = InsightStore(store_path(project_name))
+    try:
+        store.replace(all_insights)
+        final_output = store.render_markdown()
+    finally:
+        store.close()
     OUT.write_text(final_output, encoding="utf-8")
 
-    print(f"✅ Grounded insights saved: {OUT}")
+    print(
+        f"✅ Grounded insights saved: {OUT} "
+        f"({len(doc_files) - len(todo)} documents cached, {len(diagnostics)} skipped)"
+    )
     return final_output
 
 
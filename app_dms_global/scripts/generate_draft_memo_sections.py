@@ -3,37 +3,55 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 import argparse
-from utils.llm import ask
+from utils import progress
+from utils.llm import ask_streaming, llm
+
+SECTIONS = {
+    "01_overview.md": "Write an executive overview.",
+    "02_market.md": "Expand the market analysis.",
+    "03_regulation.md": "Explain regulatory considerations.",
+    "04_business_model.md": "Describe the business model.",
+    "05_risks.md": "Detail key risks.",
+}
 
-def main():
-    parser = argparse.ArgumentParser()
-    parser.add_argument('--project', required=True)
-    args = parser.parse_args()
 
-    BASE = Path(f"projects/{args.project}")
+def memo_prompt(insights: str, instruction: str) -> str:
+    # Insights first, instruction last: all five calls share the same prompt prefix
+    return f"""Insights:
+{insights}
+
+Using the insights above, {instruction}
+"""
+
+
+def generate_draft_memo_sections(project_name):
+    """
+    Draft the memo sections concurrently on the shared LLM executor.
+    Returns the paths of the written section files.
+    """
+    BASE = Path(f"projects/{project_name}")
     INSIGHTS = (BASE / "insights/key_insights.md").read_text(encoding="utf-8")
     MEMO = BASE / "memo"
-    MEMO.mkdir(exist_ok=True)
-
-    sections = {
-        "01_overview.md": "Write an executive overview.",
-        "02_market.md": "Expand the market analysis.",
-        "03_regulation.md": "Explain regulatory considerations.",
-        "04_business_model.md": "Describe the business model.",
-        "05_risks.md": "Detail key risks.",
-    }
-
-    for file, instruction in sections.items():
-        prompt = f"""
-    Using the insights below, {instruction}
-
-    Insights:
-    {INSIGHTS}
-    """
-        text = ask(prompt)
-        (MEMO / file).write_text(text, encoding="utf-8")
+    MEMO.mkdir(parents=True, exist_ok=True)
+
+    def write_section(item):
+        file, instruction = item
+        out = MEMO / file
+        ask_streaming(memo_prompt(INSIGHTS, instruction), out=out)
+        progress.publish(project_name, f"   ✓ memo/{file}\n")
+        return str(out)
 
+    paths = list(llm.executor.map(write_section, SECTIONS.items()))
     print("LLM memo generated")
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--project', required=True)
+    args = parser.parse_args()
+
+    generate_draft_memo_sections(args.project)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
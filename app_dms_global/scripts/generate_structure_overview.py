@@ -3,7 +3,8 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 import argparse
-from utils.llm import ask
+from utils import progress
+from utils.llm import ask_streaming
 
 def generate_structure_overview(project_name):  # <-- Accept project_name as parameter
     BASE = Path(f"projects/{project_name}")
@@ -26,7 +27,10 @@ def generate_structure_overview(project_name):  # <-- Accept project_name as par
     {INSIGHTS}
     """
 
-    OUT.write_text(ask(prompt), encoding="utf-8")
+    # Streamed into the file; the progress channel only gets a notice, as
+    # this runs alongside project_reasoning, which streams there
+    ask_streaming(prompt, out=OUT)
+    progress.publish(project_name, "   ✓ memo/structure_overview.md\n")
     print("LLM structure overview generated")
 
 def main():  # <-- Separate main function for CLI
@@ -0,0 +1,103 @@
+# maintenance.py — explicit, opt-in cache clean-up (nothing here runs on import)
+#
+#   python -m app_dms_global.scripts.maintenance llm pycache
+#   python -m app_dms_global.scripts.maintenance rag manifest --project current_project
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import os
+import shutil
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Never descended into when looking for bytecode caches
+PRUNE_DIRS = {"projects", "outputs", ".git", ".venv", "venv", "node_modules", ".llm_cache"}
+
+
+def clear_llm_cache():
+    """Drop cached LLM responses (.llm_cache in the working directory)."""
+    path = Path(".llm_cache")
+    shutil.rmtree(path, ignore_errors=True)
+    return [str(path)]
+
+
+def clear_pycache():
+    """Remove __pycache__ folders from the source tree only (project data is not walked)."""
+    removed = []
+    for dirpath, dirnames, _ in os.walk(ROOT):
+        dirnames[:] = [d for d in dirnames if d not in PRUNE_DIRS]
+        if "__pycache__" in dirnames:
+            target = Path(dirpath) / "__pycache__"
+            shutil.rmtree(target, ignore_errors=True)
+            removed.append(str(target))
+            dirnames.remove("__pycache__")
+    return removed
+
+
+def _projects(project):
+    base = Path("projects")
+    if project:
+        return [base / project]
+    return [p for p in base.iterdir() if p.is_dir()] if base.exists() else []
+
+
+def clear_rag(project=None):
+    """Delete RAG indexes (rebuilt by scripts/rag/build_index.py)."""
+    removed = []
+    for p in _projects(project):
+        if (p / "rag").exists():
+            shutil.rmtree(p / "rag", ignore_errors=True)
+            removed.append(str(p / "rag"))
+    return removed
+
+
+def clear_manifest(project=None):
+    """Forget pipeline stage fingerprints, so the next run recomputes every stage."""
+    removed = []
+    for p in _projects(project):
+        path = p / "pipeline_manifest.json"
+        if path.exists():
+            path.unlink()
+            removed.append(str(path))
+    return removed
+
+
+def clear_unused_blobs():
+    """Delete stored raw documents no project links to any more."""
+    from utils import blobstore
+    removed = blobstore.collect_garbage()
+    return [f"{blobstore.BLOB_DIR} ({removed} unused blobs)"] if removed else []
+
+
+TARGETS = {
+    "llm": lambda project: clear_llm_cache(),
+    "pycache": lambda project: clear_pycache(),
+    "rag": clear_rag,
+    "manifest": clear_manifest,
+    "blobs": lambda project: clear_unused_blobs(),
+}
+
+
+def clear_caches(targets, project=None):
+    removed = []
+    for target in targets:
+        removed.extend(TARGETS[target](project))
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clear selected caches")
+    parser.add_argument('targets', nargs='+', choices=sorted(TARGETS), help='Caches to clear')
+    parser.add_argument('--project', help='Limit project-level targets (rag, manifest) to one project')
+    args = parser.parse_args()
+
+    removed = clear_caches(args.targets, args.project)
+    for path in removed:
+        print(f"🗑️ Removed {path}")
+    print(f"✅ Cleared {', '.join(args.targets)} ({len(removed)} paths)")
+
+
+if __name__ == "__main__":
+    main()
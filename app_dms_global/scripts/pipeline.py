@@ -1,33 +1,261 @@
-from app_dms_global.scripts.standardize_documents import standardize_documents
-from app_dms_global.scripts.extract_key_insights import extract_key_insights
-from app_dms_global.scripts.project_reasoning import project_reasoning
-from app_dms_global.scripts.generate_structure_overview import generate_structure_overview
-from app_dms_global.scripts.financial.extract_financials import extract_financials
-from app_dms_global.scripts.financial.generate_financial_charts import generate_financial_charts
-from app_dms_global.scripts.generate_business_deck import generate_business_deck
-from app_dms_global.scripts.deck_md_to_ppt import deck_md_to_ppt
+# app_dms_global/scripts/pipeline.py
+#
+# Stage implementations are imported inside each stage: importing this module
+# (callbacks.py does so at app start-up) stays cheap, and pandas, matplotlib,
+# pypdf, pptx... load only when the pipeline actually runs. Cache clean-up is
+# an explicit command: python -m app_dms_global.scripts.maintenance --help
+
+import sys
 from pathlib import Path
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+import functools
 import time
 import json
 
-# app_dms_global/scripts/pipeline.py
+from app_dms_global.utils import progress
+from app_dms_global.utils.dag import Stage, run_stages, critical_path
+from app_dms_global.utils.fingerprint import StageManifest
+# Scripts import the LLM client as utils.llm: use the same module to share their client and rate limiter
+from utils.llm import llm
 
-import sys
-from pathlib import Path
-import shutil
+SCRIPTS = "app_dms_global.scripts"
+
+def _step(project_id: str, message: str):
+    """Announce a stage on stdout and on the project's live progress channel."""
+    print(f"\n{message}")
+    progress.publish(project_id, f"\n{message}\n")
+
+# ──────────────── STAGES ──────────────────
+# Each stage receives the shared context: project_id, sector, territory,
+# base (project Path) and results (return values of finished stages).
+
+def standardize_stage(ctx):
+    from app_dms_global.scripts.standardize_documents import standardize_documents
+    standardized_docs = standardize_documents(ctx["project_id"])
+    if standardized_docs:
+        print(f"   ✅ Standardized {len(standardized_docs)} documents")
+    elif any((ctx["base"] / "standardized/docs").glob("*.md")):
+        print(f"   ✅ Standardized documents already up to date")
+    else:
+        print(f"   ⚠️ No documents standardized")
+    return standardized_docs
+
+def standardize_fallback(ctx, e):
+    print(f"   ❌ Standardization error: {e}")
+    # Create sample documents for testing
+    sample_dir = ctx["base"] / "standardized/docs"
+    sample_dir.mkdir(parents=True, exist_ok=True)
+    sample_file = sample_dir / "sample_document.md"
+    sample_file.write_text("# Sample Document\n\nContent from uploaded files would appear here.", encoding="utf-8")
+
+def insights_stage(ctx):
+    from app_dms_global.scripts.extract_key_insights import extract_key_insights
+    insights = extract_key_insights(ctx["project_id"])
+    if insights:
+        print(f"   ✅ Extracted {len(insights) if isinstance(insights, list) else 'some'} insights")
+    else:
+        print(f"   ⚠️ No insights extracted")
+    return insights
+
+def insights_fallback(ctx, e):
+    print(f"   ❌ Insights extraction error: {e}")
+    # Create sample insights
+    insights_path = ctx["base"] / "insights/key_insights.md"
+    insights_path.parent.mkdir(parents=True, exist_ok=True)
+    insights_path.write_text("# Key Insights\n\nDocument analysis would appear here.", encoding="utf-8")
+    # Drop the previous run's records too, or the deck would cite documents that are gone
+    from app_dms_global.utils.insights_store import InsightStore, store_path
+    store = InsightStore(store_path(ctx["project_id"]))
+    try:
+        store.replace([])
+    finally:
+        store.close()
+
+def reasoning_stage(ctx):
+    from app_dms_global.scripts.project_reasoning import project_reasoning
+    # Create question based on sector/territory
+    reasoning_question = f"Based on the document analysis, what are the key investment considerations for this {ctx['sector']} project in {ctx['territory']}?"
+    project_context = project_reasoning(reasoning_question, ctx["project_id"])
+    print(f"   ✅ Project reasoning completed")
+    return project_context
+
+def reasoning_fallback(ctx, e):
+    print(f"   ❌ Reasoning error: {e}")
+    return f"Project analysis for {ctx['sector']} in {ctx['territory']}"
+
+def structure_stage(ctx):
+    from app_dms_global.scripts.generate_structure_overview import generate_structure_overview
+    # LLM quota is enforced by the client's shared rate limiter (DMS_LLM_RPM / DMS_LLM_TPM)
+    structure = generate_structure_overview(ctx["project_id"])
+    print(f"   ✅ Structure overview generated")
+    return structure
+
+def structure_fallback(ctx, e):
+    print(f"   ❌ Structure error: {e}")
+    # Create sample structure
+    structure_path = ctx["base"] / "memo/structure_overview.md"
+    structure_path.parent.mkdir(parents=True, exist_ok=True)
+    structure_path.write_text(f"# Structure Overview\n\n{ctx['sector']} project in {ctx['territory']}", encoding="utf-8")
+
+def memo_stage(ctx):
+    from app_dms_global.scripts.generate_draft_memo_sections import generate_draft_memo_sections
+    memo_sections = generate_draft_memo_sections(ctx["project_id"])
+    print(f"   ✅ Drafted {len(memo_sections)} memo sections")
+    return memo_sections
+
+def memo_fallback(ctx, e):
+    # The deck is still generated from insights and structure alone
+    print(f"   ❌ Memo drafting error: {e}")
+
+def financials_stage(ctx):
+    from app_dms_global.scripts.financial.extract_financials import extract_financials
+    # sector/territory are not written into summary.json: the deck stage receives
+    # them directly, and keeping them out lets a territory change skip this stage
+    financial_data, financial_path = extract_financials(ctx["project_id"])
+    print(f"   ✅ Financial data extracted")
+    return financial_path
+
+def financials_fallback(ctx, e):
+    print(f"   ❌ Financial extraction error: {e}")
+    # Create sample financial data
+    financial_dir = ctx["base"] / "financial"
+    financial_dir.mkdir(parents=True, exist_ok=True)
+    sample_data = {
+        "revenue": {"year_1": 1250000, "year_2": 1680000, "year_3": 2250000},
+        "ebitda": {"year_1": 250000, "year_2": 420000, "year_3": 630000},
+        "project_info": {"sector": ctx["sector"], "territory": ctx["territory"]}
+    }
+    financial_path = financial_dir / "summary.json"
+    with open(financial_path, 'w') as f:
+        json.dump(sample_data, f, indent=2)
+    return str(financial_path)
+
+def charts_stage(ctx):
+    from app_dms_global.scripts.financial.generate_financial_charts import generate_financial_charts
+    chart_path = generate_financial_charts(ctx["project_id"])
+    print(f"   ✅ Financial charts generated")
+    return chart_path
+
+def charts_fallback(ctx, e):
+    print(f"   ❌ Charts error: {e}")
+    return None
+
+def deck_stage(ctx):
+    from app_dms_global.scripts.generate_business_deck import generate_business_deck
+    deck_md = generate_business_deck(ctx["project_id"], ctx["sector"], ctx["territory"])
+    print(f"   ✅ Business deck generated ({len(deck_md) if deck_md else 0} characters)")
+    return deck_md
+
+def deck_fallback(ctx, e):
+    print(f"   ❌ Deck generation error: {e}")
+    project_id, sector, territory = ctx["project_id"], ctx["sector"], ctx["territory"]
+    # Create a basic deck
+    deck_dir = ctx["base"] / "deck"
+    deck_dir.mkdir(parents=True, exist_ok=True)
+    deck_path = deck_dir / "deck.md"
+    basic_deck = f"""# {sector} Investment Deck - {project_id}
+
+## Project Overview
+**Sector:** {sector}
+**Territory:** {territory}
+
+## Executive Summary
+Investment opportunity based on document analysis.
+
+## Document Insights
+Review the uploaded documents for detailed analysis.
+
+## Financial Summary
+See attached financial projections.
+
+## Investment Opportunity
+Compelling opportunity with growth potential."""
+    deck_path.write_text(basic_deck, encoding="utf-8")
+    return basic_deck
 
-# ──────────────── CLEAR CACHES ──────────────────
-ROOT = Path(__file__).resolve().parents[2]
+def ppt_stage(ctx):
+    from app_dms_global.scripts.deck_md_to_ppt import deck_md_to_ppt
+    final_deck_path = deck_md_to_ppt(ctx["project_id"], ctx["audience"])
+    print(f"   ✅ PowerPoint created: {final_deck_path}")
+    return final_deck_path
 
-# 1. Remove LLM mock cache
-LLM_CACHE = ROOT / ".llm_cache"
-shutil.rmtree(LLM_CACHE, ignore_errors=True)
+def ppt_fallback(ctx, e):
+    print(f"   ❌ PowerPoint error: {e}")
+    print("   Creating simple text version instead...")
+    project_id, audience = ctx["project_id"], ctx["audience"]
 
-# 2. Remove all Python bytecode caches
-for p in ROOT.rglob("__pycache__"):
-    shutil.rmtree(p, ignore_errors=True)
+    # Create a simple text output
+    simple_path = Path(f"projects/{project_id}/outputs/{project_id}-{audience}.txt")
+    simple_path.parent.mkdir(parents=True, exist_ok=True)
 
-# Now proceed with normal imports
+    # Include actual content from the deck
+    deck_content = ""
+    deck_file = ctx["base"] / "deck/deck.md"
+    if deck_file.exists():
+        deck_content = deck_file.read_text(encoding="utf-8")[:500]
+
+    summary = f"""Business Deck Summary
+Project: {project_id}
+Sector: {ctx['sector']}
+Territory: {ctx['territory']}
+
+Deck Content Preview:
+{deck_content}
+
+Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}"""
+
+    simple_path.write_text(summary, encoding="utf-8")
+    return str(simple_path)
+
+
+# Inputs/outputs are formatted with the run context; fingerprints cover
+# their content plus the declared params and the code of each stage
+P = "projects/{project_id}"
+STAGES = [
+    Stage("standardize", standardize_stage, fallback=standardize_fallback,
+          inputs=[f"{P}/raw_docs"], outputs=[f"{P}/standardized/docs"],
+          code=[f"{SCRIPTS}.standardize_documents"]),
+    Stage("insights", insights_stage, deps=["standardize"], fallback=insights_fallback,
+          inputs=[f"{P}/standardized/docs"], outputs=[f"{P}/insights/key_insights.md", f"{P}/insights/insights.db"],
+          code=[f"{SCRIPTS}.extract_key_insights"]),
+    Stage("reasoning", reasoning_stage, deps=["insights"], fallback=reasoning_fallback,
+          inputs=[f"{P}/insights/key_insights.md"], outputs=[f"{P}/project_reasoning.txt"],
+          params=["sector", "territory"], code=[f"{SCRIPTS}.project_reasoning"]),
+    Stage("structure", structure_stage, deps=["insights"], fallback=structure_fallback,
+          inputs=[f"{P}/insights/key_insights.md"], outputs=[f"{P}/memo/structure_overview.md"],
+          code=[f"{SCRIPTS}.generate_structure_overview"]),
+    Stage("memo", memo_stage, deps=["insights"], fallback=memo_fallback,
+          inputs=[f"{P}/insights/key_insights.md"], outputs=[f"{P}/memo/01_overview.md"],
+          code=[f"{SCRIPTS}.generate_draft_memo_sections"]),
+    Stage("financials", financials_stage, fallback=financials_fallback,
+          inputs=[f"{P}/raw_docs"], outputs=[f"{P}/financial/summary.json"],
+          code=[f"{SCRIPTS}.financial.extract_financials"]),
+    Stage("charts", charts_stage, fallback=charts_fallback,
+          inputs=[f"{P}/raw_docs"], outputs=[f"{P}/financial/charts/revenue.png"],
+          code=[f"{SCRIPTS}.financial.generate_financial_charts"]),
+    Stage("deck", deck_stage, deps=["insights", "reasoning", "structure", "memo", "financials"],
+          fallback=deck_fallback,
+          inputs=[f"{P}/insights/key_insights.md", f"{P}/project_reasoning.txt", f"{P}/memo", f"{P}/financial/summary.json"],
+          outputs=[f"{P}/deck/deck.md"],
+          params=["sector", "territory"], code=[f"{SCRIPTS}.generate_business_deck"]),
+    Stage("ppt", ppt_stage, deps=["deck", "charts"], fallback=ppt_fallback,
+          inputs=[f"{P}/deck/deck.md", f"{P}/insights/key_insights.md", f"{P}/financial/charts"],
+          outputs=["outputs/{project_id}-{audience}.pptx"],
+          params=["audience"], code=[f"{SCRIPTS}.deck_md_to_ppt"]),
+]
+
+STAGE_LABELS = {
+    "standardize": "1. 📄 Standardizing documents...",
+    "insights": "2. 🔍 Extracting key insights...",
+    "reasoning": "3. 💭 Reasoning on project...",
+    "structure": "4. 🏛️ Generating structure overview...",
+    "memo": "4b. 📝 Drafting memo sections...",
+    "financials": "5. 📈 Extracting financial data...",
+    "charts": "6. 📊 Generating financial charts...",
+    "deck": "7. 📋 Generating business deck...",
+    "ppt": "8. 📈 Creating PowerPoint presentation...",
+}
 
 def run_pipeline(
     project_id: str,
@@ -35,9 +263,18 @@ def run_pipeline(
     territory: str,
     input_dir: str,
     output_dir: str,
+    audience: str = "investors",
+    max_workers: int = 4,
+    force: bool = False,
 ):
     """
     Run the complete pipeline for generating business decks.
+
+    Stages run as a dependency graph (see STAGES): the financial stages
+    run alongside standardization → insights → reasoning/structure/memo.
+    A stage is skipped when its inputs, parameters and code are unchanged
+    since its last successful run and its outputs exist
+    (projects/{project_id}/pipeline_manifest.json).
     
     Args:
         project_id: The project identifier/name
@@ -45,6 +282,9 @@ def run_pipeline(
         territory: Geographic territory (e.g., "US", "EU")
         input_dir: Directory containing raw input documents
         output_dir: Directory for output files
+        audience: Target audience for the deck
+        max_workers: Stages allowed to run at the same time
+        force: Re-run every stage regardless of fingerprints
     """
     
     print(f"🚀 Starting pipeline for project: {project_id}")
@@ -55,175 +295,63 @@ def run_pipeline(
         # Create project directory structure if needed
         BASE = Path(f"projects/{project_id}")
         BASE.mkdir(parents=True, exist_ok=True)
-        
-        # 1. Standardize documents (convert PDF/DOCX to markdown)
-        print("\n1. 📄 Standardizing documents...")
-        try:
-            standardized_docs = standardize_documents(project_id)
-            if standardized_docs:
-                print(f"   ✅ Standardized {len(standardized_docs) if isinstance(standardized_docs, list) else 'some'} documents")
-            else:
-                print(f"   ⚠️ No documents standardized")
-        except Exception as e:
-            print(f"   ❌ Standardization error: {e}")
-            # Create sample documents for testing
-            sample_dir = BASE / "standardized/docs"
-            sample_dir.mkdir(parents=True, exist_ok=True)
-            sample_file = sample_dir / "sample_document.md"
-            sample_file.write_text("# Sample Document\n\nContent from uploaded files would appear here.", encoding="utf-8")
-        
-        # 2. Extract key insights from standardized documents
-        print("\n2. 🔍 Extracting key insights...")
-        time.sleep(3)  # Small delay
-        try:
-            insights = extract_key_insights(project_id)
-            if insights:
-                print(f"   ✅ Extracted {len(insights) if isinstance(insights, list) else 'some'} insights")
-            else:
-                print(f"   ⚠️ No insights extracted")
-        except Exception as e:
-            print(f"   ❌ Insights extraction error: {e}")
-            # Create sample insights
-            insights_path = BASE / "insights/key_insights.md"
-            insights_path.parent.mkdir(parents=True, exist_ok=True)
-            insights_path.write_text("# Key Insights\n\nDocument analysis would appear here.", encoding="utf-8")
-        
-        # 3. Reason on project with insights
-        print("\n3. 💭 Reasoning on project...")
-        try:
-            # Create question based on sector/territory
-            reasoning_question = f"Based on the document analysis, what are the key investment considerations for this {sector} project in {territory}?"
-            project_context = project_reasoning(reasoning_question)
-            print(f"   ✅ Project reasoning completed")
-        except Exception as e:
-            print(f"   ❌ Reasoning error: {e}")
-            project_context = f"Project analysis for {sector} in {territory}"
-        
-        # 4. Generate structure overview
-        print("\n4. 🏛️ Generating structure overview...")
-        time.sleep(5)  # Wait to avoid rate limit
-        try:
-            structure = generate_structure_overview(project_id)
-            print(f"   ✅ Structure overview generated")
-        except Exception as e:
-            print(f"   ❌ Structure error: {e}")
-            # Create sample structure
-            structure_path = BASE / "memo/structure_overview.md"
-            structure_path.parent.mkdir(parents=True, exist_ok=True)
-            structure_path.write_text(f"# Structure Overview\n\n{sector} project in {territory}", encoding="utf-8")
-        
-        # 5. Extract financials
-        print("\n5. 📈 Extracting financial data...")
-        try:
-            financial_data, financial_path = extract_financials(project_id)
-            print(f"   ✅ Financial data extracted")
-            # Save sector/territory in financial data
-            if isinstance(financial_data, dict):
-                financial_data["project_info"] = {
-                    "sector": sector,
-                    "territory": territory,
-                    "project_id": project_id
-                }
-                # Update the JSON file
-                financial_path_obj = Path(financial_path)
-                if financial_path_obj.exists():
-                    with open(financial_path_obj, 'w') as f:
-                        json.dump(financial_data, f, indent=2)
-        except Exception as e:
-            print(f"   ❌ Financial extraction error: {e}")
-            # Create sample financial data
-            financial_dir = BASE / "financial"
-            financial_dir.mkdir(parents=True, exist_ok=True)
-            sample_data = {
-                "revenue": {"year_1": 1250000, "year_2": 1680000, "year_3": 2250000},
-                "ebitda": {"year_1": 250000, "year_2": 420000, "year_3": 630000},
-                "project_info": {"sector": sector, "territory": territory}
-            }
-            financial_path = financial_dir / "summary.json"
-            with open(financial_path, 'w') as f:
-                json.dump(sample_data, f, indent=2)
-        
-        # 6. Generate financial charts
-        print("\n6. 📊 Generating financial charts...")
-        try:
-            chart_path = generate_financial_charts(project_id)
-            print(f"   ✅ Financial charts generated")
-        except Exception as e:
-            print(f"   ❌ Charts error: {e}")
-            chart_path = None
-        
-        # 7. Generate business deck markdown (PASS SECTOR AND TERRITORY)
-        print("\n7. 📋 Generating business deck...")
-        try:
-            # Import here to ensure we have the latest version
-            from app_dms_global.scripts.generate_business_deck import generate_business_deck
-            deck_md = generate_business_deck(project_id, sector, territory)
-            print(f"   ✅ Business deck generated ({len(deck_md) if deck_md else 0} characters)")
-        except Exception as e:
-            print(f"   ❌ Deck generation error: {e}")
-            # Create a basic deck
-            deck_dir = BASE / "deck"
-            deck_dir.mkdir(parents=True, exist_ok=True)
-            deck_path = deck_dir / "deck.md"
-            basic_deck = f"""# {sector} Investment Deck - {project_id}
+        progress.reset(project_id)
 
-## Project Overview
-**Sector:** {sector}
-**Territory:** {territory}
-
-## Executive Summary
-Investment opportunity based on document analysis.
+        ctx = {
+            "project_id": project_id,
+            "sector": sector,
+            "territory": territory,
+            "audience": audience,
+            "base": BASE,
+        }
+        manifest = StageManifest(BASE / "pipeline_manifest.json")
 
-## Document Insights
-Review the uploaded documents for detailed analysis.
-
-## Financial Summary
-See attached financial projections.
+        def on_finish(stage, result):
+            if result.status == "ok":
+                manifest.record(stage, result.value)
+            elif result.status == "skipped":
+                print(f"   ⏭️ {stage.name}: inputs unchanged, skipped")
+            else:
+                manifest.invalidate(stage.name)
 
-## Investment Opportunity
-Compelling opportunity with growth potential."""
-            deck_path.write_text(basic_deck, encoding="utf-8")
-            deck_md = basic_deck
-        
-        # 8. Export to PowerPoint
-        print("\n8. 📈 Creating PowerPoint presentation...")
-        audience = "investors"
-        try:
-            final_deck_path = deck_md_to_ppt(project_id, audience)
-            print(f"   ✅ PowerPoint created: {final_deck_path}")
-        except Exception as e:
-            print(f"   ❌ PowerPoint error: {e}")
-            print("   Creating simple text version instead...")
-            
-            # Create a simple text output
-            simple_path = Path(f"projects/{project_id}/outputs/{project_id}-{audience}.txt")
-            simple_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Include actual content from the deck
-            deck_content = ""
-            deck_file = BASE / "deck/deck.md"
-            if deck_file.exists():
-                deck_content = deck_file.read_text(encoding="utf-8")[:500]
-            
-            summary = f"""Business Deck Summary
-Project: {project_id}
-Sector: {sector}
-Territory: {territory}
+        started = time.perf_counter()
+        waited_before = llm.limiter.waited
+        results = run_stages(
+            STAGES,
+            ctx,
+            max_workers=max_workers,
+            on_start=lambda stage: _step(project_id, STAGE_LABELS[stage.name]),
+            # Forced runs still fingerprint each stage, so the manifest
+            # records what this run was built from
+            skip=functools.partial(manifest.check, force=force),
+            on_finish=on_finish,
+        )
+        manifest.save()
+        wall = time.perf_counter() - started
+        idle = llm.limiter.waited - waited_before
 
-Deck Content Preview:
-{deck_content}
+        failed = [r for r in results.values() if r.status == "failed"]
+        if failed:
+            raise failed[0].error
+        final_deck_path = results["ppt"].value
 
-Generated: {time.strftime('%Y-%m-%d %H:%M:%S')}"""
-            
-            simple_path.write_text(summary, encoding="utf-8")
-            final_deck_path = str(simple_path)
+        path, path_seconds = critical_path(STAGES, results)
+        print(f"\n⏱️ Stage timings (wall {wall:.1f}s):")
+        for name, r in results.items():
+            print(f"   {name:<12} {r.duration:6.1f}s  {r.status}")
+        print(f"   Critical path: {' → '.join(path)} ({path_seconds:.1f}s)")
+        print(f"   Idle on LLM rate limits: {idle:.1f}s")
         
         print(f"\n🎉 Pipeline completed successfully!")
         print(f"📁 Output saved to: {final_deck_path}")
         
         # Create a completion marker
         completion_file = BASE / "pipeline_complete.txt"
-        completion_file.write_text(f"Pipeline completed at {time.strftime('%Y-%m-%d %H:%M:%S')}\nSector: {sector}\nTerritory: {territory}", encoding="utf-8")
+        completion_file.write_text(
+            f"Pipeline completed at {time.strftime('%Y-%m-%d %H:%M:%S')}\nSector: {sector}\nTerritory: {territory}"
+            f"\nDuration: {wall:.1f}s\nIdle on LLM rate limits: {idle:.1f}s",
+            encoding="utf-8",
+        )
         
         return final_deck_path
         
@@ -255,6 +383,7 @@ if __name__ == "__main__":
     parser.add_argument('--input-dir', help='Input directory (optional, uses project structure)')
     parser.add_argument('--output-dir', help='Output directory (optional, uses project structure)')
     parser.add_argument('--audience', default='investors', help='Target audience for deck')
+    parser.add_argument('--force', action='store_true', help='Re-run every stage')
     
     args = parser.parse_args()
     
@@ -268,6 +397,8 @@ if __name__ == "__main__":
         territory=args.territory,
         input_dir=input_dir,
         output_dir=output_dir,
+        audience=args.audience,
+        force=args.force,
     )
     
     print(f"\nFinal result: {result}")
\ No newline at end of file
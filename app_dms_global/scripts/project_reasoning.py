@@ -3,10 +3,12 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 import argparse
-from utils.llm import ask
+from utils.llm import ask_streaming
 
-def project_reasoning(question):  # <-- Function takes parameter
-    answer = ask(question)
+def project_reasoning(question, project_name=None):  # <-- Function takes parameter
+    # With a project, the answer streams into project_reasoning.txt (read by the deck step)
+    out = Path(f"projects/{project_name}/project_reasoning.txt") if project_name else None
+    answer = ask_streaming(question, out=out, channel=project_name)
     return answer  # <-- Return the answer instead of printing
 
 def main():  # <-- Separate main function for CLI
@@ -15,7 +17,7 @@ def main():  # <-- Separate main function for CLI
     parser.add_argument("--question", required=True)
     args = parser.parse_args()
 
-    answer = project_reasoning(args.question)  # <-- Call function with argument
+    answer = project_reasoning(args.question, args.project)  # <-- Call function with argument
     print("\nANSWER:\n", answer)
     
 if __name__ == "__main__":
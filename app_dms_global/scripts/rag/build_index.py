@@ -1,22 +1,224 @@
+import sys
 from pathlib import Path
-from sentence_transformers import SentenceTransformer
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+
+import argparse
+import hashlib
+import json
+
 import faiss
-import pickle
+import numpy as np
+from utils import embeddings
+from utils.chunker import iter_chunk_spans, token_length
+from utils.rag import rag_dir, load_index, save_index, INDEX_FILE
+
+MANIFEST_FILE = "manifest.json"
+
+# Chunk limits in model tokens; all-MiniLM-L6-v2 truncates inputs at 256
+CHUNK_SIZE = 254
+CHUNK_OVERLAP = 32
+BATCH_SIZE = 128
+
+
+def split_document(text: str, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """Yield (chunk, start, end) for every non-blank chunk of a document."""
+    length = token_length(embeddings.tokenizer())
+    for start, end in iter_chunk_spans(text, chunk_size, overlap, length):
+        chunk = text[start:end]
+        if chunk.strip():
+            yield chunk, start, end
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_manifest(project_name) -> dict:
+    path = rag_dir(project_name) / MANIFEST_FILE
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def write_manifest(project_name, manifest: dict):
+    path = rag_dir(project_name) / MANIFEST_FILE
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def load_or_create_index(project_name, manifest: dict):
+    """
+    Return the project's ID-mapped index, or a fresh one when there is
+    nothing reusable (no manifest, other model, or index out of sync).
+    """
+    path = rag_dir(project_name) / INDEX_FILE
+    known = sum(len(d["chunks"]) for d in manifest.get("documents", {}).values())
+
+    if manifest.get("model") == embeddings.model_id() and path.exists():
+        index = faiss.read_index(str(path))
+        if isinstance(index, faiss.IndexIDMap2) and index.ntotal == known:
+            return index, manifest
+
+    return faiss.IndexIDMap2(faiss.IndexFlatL2(embeddings.dimension())), {}
+
+
+def _unchanged(doc: Path, entry: dict | None, chunking: list) -> bool:
+    """
+    Whether `doc` still has the content (and chunking) its manifest entry
+    was built from; the file is only re-hashed when its size or mtime moved.
+    """
+    if not entry or "sha256" not in entry or entry.get("chunking") != chunking:
+        return False
+    st = doc.stat()
+    if entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return True
+    return content_hash(doc.read_text(encoding="utf-8")) == entry["sha256"]
+
+
+def build_index(
+    project_name,
+    full=False,
+    chunk_size=CHUNK_SIZE,
+    overlap=CHUNK_OVERLAP,
+    batch_size=BATCH_SIZE,
+    threads=None,
+):
+    """
+    Bring projects/{project}/rag in line with standardized/docs.
+
+    Documents are split into overlapping chunks, each embedded as one vector.
+    A document whose content hash matches the manifest keeps its chunk list,
+    spans and vectors without being read or re-chunked (its passages come
+    from the current store); other documents are re-chunked and only chunks
+    whose content hash is not already indexed are embedded. Vectors of
+    changed or deleted documents are removed from the index, and nothing is
+    rewritten when no document changed.
+
+    Args:
+        project_name: The project identifier/name
+        full: Ignore the manifest and re-embed every chunk
+        chunk_size: Maximum chunk length in model tokens
+        overlap: Tokens shared by consecutive chunks
+        batch_size: Chunks per encoder batch
+        threads: Torch CPU threads used for encoding (default: torch's choice)
+    """
+    DOCS = Path(f"projects/{project_name}/standardized/docs")
+    if not DOCS.exists():
+        raise RuntimeError("No standardized documents found. Aborting.")
+
+    manifest = {} if full else load_manifest(project_name)
+    index, manifest = load_or_create_index(project_name, manifest)
+    previous = manifest.get("documents", {})
+    chunking = [chunk_size, overlap]
+
+    docs = sorted(DOCS.glob("*.md"))
+    kept = {doc.name for doc in docs if _unchanged(doc, previous.get(doc.name), chunking)}
+
+    if previous and kept == set(previous) and len(kept) == len(docs):
+        chunks = sum(len(d["chunks"]) for d in previous.values())
+        print(f"RAG index for {project_name} is up to date ({chunks} chunks)")
+        return {"chunks": chunks, "embedded": 0, "reused": chunks, "removed": 0}
+
+    # hash -> vector ids currently in the index, available for reuse by
+    # changed documents (ids of unchanged documents are never handed out)
+    reusable = {}
+    for name, doc in previous.items():
+        if name not in kept:
+            for h, vector_id, *_ in doc["chunks"]:
+                reusable.setdefault(h, []).append(vector_id)
+
+    store = load_index(project_name) if kept else None
+    next_id = manifest.get("next_id", 0)
+    documents = {}
+    texts, sources, ids, spans = [], [], [], []
+    new_texts, new_ids = [], []
+
+    for doc in docs:
+        st = doc.stat()
+        if doc.name in kept:
+            entry = previous[doc.name]
+            for _, vector_id, start, end in entry["chunks"]:
+                texts.append(store.passage(vector_id)[0])
+                sources.append(doc.name)
+                ids.append(vector_id)
+                spans.append((start, end))
+            documents[doc.name] = {**entry, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+            continue
+
+        chunks = []
+        text = doc.read_text(encoding="utf-8")
+        for chunk, start, end in split_document(text, chunk_size, overlap):
+            h = content_hash(chunk)
+            if reusable.get(h):
+                vector_id = reusable[h].pop()
+            else:
+                vector_id = next_id
+                next_id += 1
+                new_texts.append(chunk)
+                new_ids.append(vector_id)
+            chunks.append([h, vector_id, start, end])
+            texts.append(chunk)
+            sources.append(doc.name)
+            ids.append(vector_id)
+            spans.append((start, end))
+        documents[doc.name] = {
+            "sha256": content_hash(text),
+            "size": st.st_size,
+            "mtime_ns": st.st_mtime_ns,
+            "chunking": chunking,
+            "chunks": chunks,
+        }
+
+    stale = [vector_id for pool in reusable.values() for vector_id in pool]
+    if stale:
+        index.remove_ids(np.asarray(stale, dtype=np.int64))
+
+    if new_texts:
+        if threads:
+            embeddings.set_threads(threads)
+        vectors = embeddings.encode(new_texts, batch_size=batch_size)
+        index.add_with_ids(vectors, np.asarray(new_ids, dtype=np.int64))
+
+    save_index(project_name, index, texts, sources, ids, spans)
+    write_manifest(project_name, {
+        "model": embeddings.model_id(),
+        "next_id": next_id,
+        "documents": documents,
+    })
 
-BASE = Path("projects/business-food-chad/standardized/docs")
+    stats = {
+        "chunks": len(texts),
+        "embedded": len(new_texts),
+        "reused": len(texts) - len(new_texts),
+        "removed": len(stale),
+    }
+    print(
+        f"RAG index built for {project_name}: {stats['embedded']} chunks re-embedded, "
+        f"{stats['reused']} reused ({len(kept)} documents unchanged), {stats['removed']} removed"
+    )
+    return stats
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
 
-texts, sources = [], []
+def main():
+    parser = argparse.ArgumentParser(description="Build or update a project's RAG index")
+    parser.add_argument('--project', required=True)
+    parser.add_argument('--full', action='store_true', help='Re-embed every chunk')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Maximum chunk length in model tokens')
+    parser.add_argument('--overlap', type=int, default=CHUNK_OVERLAP, help='Tokens shared by consecutive chunks')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Chunks per encoder batch')
+    parser.add_argument('--threads', type=int, help='CPU threads used for encoding')
+    args = parser.parse_args()
 
-for doc in BASE.glob("*.md"):
-    text = doc.read_text(encoding="utf-8")
-    texts.append(text)
-    sources.append(doc.name)
+    build_index(
+        args.project,
+        full=args.full,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        batch_size=args.batch_size,
+        threads=args.threads,
+    )
 
-embeddings = model.encode(texts)
-index = faiss.IndexFlatL2(embeddings.shape[1])
-index.add(embeddings)
 
-pickle.dump((index, texts, sources), open("rag_index.pkl", "wb"))
-print("RAG index built")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -3,53 +3,416 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
 import argparse
+import datetime
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import signal
+import time
+import uuid
 from pypdf import PdfReader
 from docx import Document
+from openpyxl import load_workbook
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+from utils import blobstore
 
-def standardize_documents(project_name):  # <-- Function takes parameter
-    BASE = Path(f"projects/{project_name}")
-    RAW = BASE / "raw_docs"
-    OUT = BASE / "standardized/docs"
-    OUT.mkdir(parents=True, exist_ok=True)
+SUPPORTED = {".pdf", ".docx", ".xlsx", ".pptx"}
 
-    SUPPORTED = {".pdf", ".docx"}
+# Bump whenever extract_text changes its output: cached extractions of
+# older versions are then ignored and every document is processed again
+EXTRACTOR_VERSION = 3
+CACHE_NAME = f"standardized-v{EXTRACTOR_VERSION}.txt"
+MANIFEST = "manifest.json"
 
-    def extract_text(file: Path) -> str:
-        if file.suffix.lower() == ".pdf":
-            reader = PdfReader(file)
-            return "\n".join(page.extract_text() or "" for page in reader.pages)
+# PDFs larger than this are split into page ranges extracted in parallel
+LARGE_PDF_BYTES = 2 * 1024 * 1024
+PAGES_PER_TASK = 40
 
-        if file.suffix.lower() == ".docx":
-            doc = Document(file)
-            return "\n".join(p.text for p in doc.paragraphs)
+# pypdf caches every object it parses on the reader; the cache is dropped
+# every few pages so memory stays flat on long files
+PAGES_PER_RELEASE = 20
 
+# Precede each PDF page's / slide's text, for page-level citations
+PAGE_MARKER = "<!-- page {} -->\n\n"
+SLIDE_MARKER = "<!-- slide {} -->\n\n"
+
+WORKERS = int(os.environ.get("DMS_STANDARDIZE_WORKERS", "0")) or os.cpu_count() or 1
+FILE_TIMEOUT = float(os.environ.get("DMS_STANDARDIZE_TIMEOUT", "120"))
+
+
+def _cell(value) -> str:
+    if value is None:
         return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, (datetime.datetime, datetime.date)):
+        value = value.isoformat()
+    return str(value).replace("|", "\\|").replace("\n", " ").strip()
+
+
+def _table_row(cells) -> str:
+    return "| " + " | ".join(cells) + " |\n"
+
+
+def _iter_pdf(file: Path, pages):
+    reader = PdfReader(file)
+    start, end = pages or (0, len(reader.pages))
+    for i in range(start, end):
+        page = reader.pages[i]
+        yield PAGE_MARKER.format(i + 1), (page.extract_text() or "") + "\n\n"
+        del page
+        if (i - start) % PAGES_PER_RELEASE == PAGES_PER_RELEASE - 1:
+            reader.resolved_objects.clear()
+
+
+def _iter_docx(file: Path):
+    for p in Document(file).paragraphs:
+        yield "", p.text + "\n"
+
+
+def _iter_xlsx(file: Path):
+    """One markdown table per sheet, streamed row by row (openpyxl read-only mode)."""
+    wb = load_workbook(file, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            yield f"## Sheet: {ws.title}\n\n", ""
+            header = None
+            for row in ws.iter_rows(values_only=True):
+                cells = [_cell(v) for v in row]
+                while cells and not cells[-1]:
+                    cells.pop()
+                if not cells:
+                    continue
+                if header is None:
+                    # First non-empty row is the header, widened to the sheet's
+                    # recorded dimension so later, wider rows still fit
+                    width = max(len(cells), ws.max_column or 0)
+                    header = cells + [""] * (width - len(cells))
+                    yield "", _table_row(header) + _table_row(["---"] * width)
+                else:
+                    if len(cells) > width:
+                        # Sheet dimension missing or wrong: keep the overflow
+                        # in the last column rather than breaking the table
+                        cells[width - 1:] = [" ".join(c for c in cells[width - 1:] if c)]
+                    yield "", _table_row(cells + [""] * (width - len(cells)))
+            yield "", "\n"
+    finally:
+        wb.close()
+
+
+def _shape_text(shape):
+    if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+        for child in shape.shapes:
+            yield from _shape_text(child)
+    elif shape.has_text_frame:
+        for p in shape.text_frame.paragraphs:
+            text = "".join(run.text for run in p.runs).strip()
+            if text:
+                yield "  " * p.level + f"- {text}\n"
+    elif getattr(shape, "has_table", False) and shape.has_table:
+        rows = [[_cell(c.text) for c in row.cells] for row in shape.table.rows]
+        if rows:
+            yield "\n" + _table_row(rows[0]) + _table_row(["---"] * len(rows[0]))
+            yield "".join(_table_row(r) for r in rows[1:]) + "\n"
+
+
+def _iter_pptx(file: Path):
+    """Slides in order: title as a heading, then text frames, tables and notes."""
+    for i, slide in enumerate(Presentation(file).slides, start=1):
+        yield SLIDE_MARKER.format(i), ""
+        title = slide.shapes.title
+        if title is not None and title.text.strip():
+            yield "", f"## {title.text.strip()}\n\n"
+        for shape in slide.shapes:
+            if title is not None and shape.shape_id == title.shape_id:
+                continue
+            for text in _shape_text(shape):
+                yield "", text
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame.text.strip()
+            if notes:
+                yield "", f"\nNotes: {notes}\n"
+        yield "", "\n"
+
+
+def iter_text(file: Path, pages: tuple | None = None):
+    """
+    Yield (marker, text) piece by piece - one PDF page, DOCX paragraph,
+    XLSX row or PPTX shape at a time - so no document is held in memory whole.
+
+    Args:
+        file: PDF, DOCX, XLSX or PPTX file
+        pages: Optional (start, end) page range of a PDF
+    """
+    suffix = file.suffix.lower()
+    if suffix == ".pdf":
+        yield from _iter_pdf(file, pages)
+    elif suffix == ".docx":
+        yield from _iter_docx(file)
+    elif suffix == ".xlsx":
+        yield from _iter_xlsx(file)
+    elif suffix == ".pptx":
+        yield from _iter_pptx(file)
+
+
+def extract_to(file: Path, dest: Path, pages: tuple | None = None) -> bool:
+    """Stream a document's text into `dest`. Returns whether any text was found."""
+    found = False
+    with open(dest, "w", encoding="utf-8") as f:
+        for marker, text in iter_text(file, pages):
+            f.write(marker)
+            f.write(text)
+            found = found or bool(text.strip())
+    return found
+
+
+def _on_alarm(signum, frame):
+    raise TimeoutError
+
+
+def _with_deadline(timeout: float, call, *args):
+    """Run call(*args) in a pool worker; SIGALRM stops a stuck parser where available."""
+    alarm = hasattr(signal, "SIGALRM") and timeout
+    if alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.alarm(math.ceil(timeout))
+    try:
+        return call(*args)
+    finally:
+        if alarm:
+            signal.alarm(0)
+
+
+# Per pending file, the wall-clock time its first task started (0: still
+# queued); shared between the parent and the workers of one run
+_started = None
+
 
-    for file in RAW.iterdir():
+def _init_worker(started):
+    global _started
+    _started = started
+
+
+def _claim_budget(index: int, timeout: float) -> float:
+    """Seconds left of file `index`'s budget, which starts with its first task."""
+    now = time.time()
+    with _started.get_lock():
+        if not _started[index]:
+            _started[index] = now
+        return _started[index] + timeout - now
+
+
+def _extract_task(index: int, file: str, dest: str, pages, timeout: float):
+    """Pool worker: (text found, seconds); the text itself goes to `dest`."""
+    start = time.perf_counter()
+    remaining = _claim_budget(index, timeout)
+    if remaining <= 0:
+        # The file already timed out: free the worker for the next one
+        raise TimeoutError
+    found = _with_deadline(remaining, extract_to, Path(file), Path(dest), pages)
+    return found, time.perf_counter() - start
+
+
+def _wait_file(tasks, started, index: int, timeout: float, poll: float = 0.5):
+    """
+    Results of one file's tasks, or TimeoutError once the file has run for
+    `timeout` seconds in total (or could not start within `timeout` of the
+    parent waiting for it, i.e. every worker is stuck).
+    """
+    queued_until = time.time() + timeout
+    for _, result in tasks:
+        while not result.ready():
+            now = time.time()
+            if started[index]:
+                remaining = started[index] + timeout - now
+            else:
+                remaining = queued_until - now
+            if remaining <= 0:
+                raise TimeoutError
+            result.wait(min(remaining, poll))
+    return [result.get() for _, result in tasks]
+
+
+def _page_count_task(file: str, timeout: float) -> int:
+    return _with_deadline(timeout, lambda: len(PdfReader(file).pages))
+
+
+def _page_ranges(pool, files, timeout):
+    """
+    {file: page ranges} for large PDFs, counted on the pool so that a
+    malformed file cannot hang the caller. Others get a single task ([None]).
+    """
+    counts = {
+        f: pool.apply_async(_page_count_task, (str(f), timeout))
+        for f in files
+        if f.suffix.lower() == ".pdf" and f.stat().st_size > LARGE_PDF_BYTES
+    }
+    ranges = {f: [None] for f in files}
+    for f, result in counts.items():
+        try:
+            n = result.get(timeout=timeout)
+        except Exception:
+            continue  # the extraction task reports the problem
+        if n > PAGES_PER_TASK:
+            ranges[f] = [(start, min(start + PAGES_PER_TASK, n)) for start in range(0, n, PAGES_PER_TASK)]
+    return ranges
+
+
+def output_name(raw_name: str) -> str:
+    """Markdown name of a raw file; keeps the extension so deck.pdf and deck.pptx do not collide."""
+    return f"{raw_name}.md"
+
+
+def standardize_documents(project_name, workers=None, timeout=FILE_TIMEOUT):
+    """
+    Extract text from every PDF/DOCX/XLSX/PPTX in raw_docs into
+    standardized/docs (raw_docs/deck.pdf -> standardized/docs/deck.pdf.md).
+
+    Documents whose content hash and extractor version match the last run
+    are left untouched; any other markdown in standardized/docs that no
+    current raw file produced is deleted. Files (and page ranges of long
+    PDFs) are extracted on a process pool. A file whose extraction fails or
+    exceeds `timeout` seconds is skipped rather than stalling the run, and
+    its previous markdown is removed.
+
+    Args:
+        project_name: The project identifier/name
+        workers: Pool size (default: DMS_STANDARDIZE_WORKERS or the CPU count)
+        timeout: Seconds allowed per file
+
+    Returns:
+        Paths (str) of the markdown files written in this run; empty when
+        every document was already up to date
+    """
+    BASE = Path(f"projects/{project_name}")
+    RAW = BASE / "raw_docs"
+    OUT = BASE / "standardized/docs"
+    OUT.mkdir(parents=True, exist_ok=True)
+
+    # raw file name -> {size, mtime_ns, sha256, version, output}
+    manifest_path = BASE / "standardized" / MANIFEST
+    previous = json.loads(manifest_path.read_text(encoding="utf-8")) if manifest_path.exists() else {}
+    manifest = {}
+
+    texts = {}      # file -> file holding its extracted text
+    pending = []    # (file, digest) still to extract
+    for file in sorted(RAW.iterdir()):
         if file.suffix.lower() not in SUPPORTED:
             print(f"Skipping unsupported file: {file.name}")
             continue
 
-        text = extract_text(file)
-        if not text.strip():
-            print(f"No text extracted from: {file.name}")
+        st = file.stat()
+        entry = previous.get(file.name)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            digest = entry["sha256"]   # unchanged on disk: no need to re-hash
+        else:
+            digest = blobstore.file_digest(file)
+        record = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest,
+                  "version": EXTRACTOR_VERSION, "output": output_name(file.name)}
+
+        if (entry and entry["sha256"] == digest and entry["version"] == EXTRACTOR_VERSION
+                and entry["output"] == record["output"] and (OUT / entry["output"]).exists()):
+            manifest[file.name] = record   # up to date: skipped entirely
             continue
 
-        out = OUT / f"{file.stem}.md"
-        out.write_text(
-            f"# Source: {file.name}\n\n{text}",
-            encoding="utf-8"
-        )
+        # Same bytes already standardized (in any project): reuse the text
+        cached = blobstore.derived_path(digest, CACHE_NAME)
+        manifest[file.name] = record
+        if cached.exists():
+            texts[file] = cached
+        else:
+            pending.append((file, digest))
 
-    print("Documents extracted & standardized")
-    return True  # <-- Optional: return success status
+    reused = len(texts)
+    timings = {}
+    if pending:
+        # spawn: the pipeline calls this from worker threads, where fork is unsafe
+        size = workers or WORKERS
+        if not any(f.stat().st_size > LARGE_PDF_BYTES for f, _ in pending):
+            size = min(size, len(pending))   # one task per file: no use for more processes
+        context = multiprocessing.get_context("spawn")
+        started = context.Array("d", len(pending))
+        pool = context.Pool(size, initializer=_init_worker, initargs=(started,))
+        incoming = blobstore.BLOB_DIR / "incoming"
+        incoming.mkdir(parents=True, exist_ok=True)
+        part_files = []
+        try:
+            ranges = _page_ranges(pool, [file for file, _ in pending], timeout)
+            submitted = []
+            for index, (file, digest) in enumerate(pending):
+                tasks = []
+                for pages in ranges[file]:
+                    part_files.append(incoming / f"{uuid.uuid4().hex}.part")
+                    tasks.append((part_files[-1], pool.apply_async(
+                        _extract_task, (index, str(file), str(part_files[-1]), pages, timeout))))
+                submitted.append((file, digest, tasks))
+
+            for index, (file, digest, tasks) in enumerate(submitted):
+                # One budget per file however many page ranges it was split
+                # into, counted from its first task (not from submission)
+                try:
+                    parts = _wait_file(tasks, started, index, timeout)
+                except (TimeoutError, multiprocessing.TimeoutError):
+                    timings[file.name] = (timeout, "timed out")
+                    manifest.pop(file.name)
+                    continue
+                except Exception as e:
+                    timings[file.name] = (0.0, f"failed: {e}")
+                    manifest.pop(file.name)
+                    continue
+                # CPU time across the file's page ranges
+                timings[file.name] = (sum(seconds for _, seconds in parts), "ok")
+                if any(found for found, _ in parts):
+                    texts[file] = blobstore.store_derived_parts(digest, CACHE_NAME, [part for part, _ in tasks])
+                else:
+                    print(f"No text extracted from: {file.name}")
+                    manifest.pop(file.name)
+        finally:
+            # Also kills any worker still stuck on a timed-out file
+            pool.terminate()
+            for part in part_files:
+                part.unlink(missing_ok=True)
+
+    processed = []
+    for file, source in texts.items():
+        out = OUT / manifest[file.name]["output"]
+        with open(out, "w", encoding="utf-8") as f, open(source, encoding="utf-8") as text:
+            f.write(f"# Source: {file.name}\n\n")
+            shutil.copyfileobj(text, f)
+        processed.append(str(out))
+
+    # Only markdown the manifest owns is current. This drops the outputs of
+    # removed documents, of files that failed or timed out (their old text
+    # no longer matches the raw file), outputs named under an older scheme
+    # and the pipeline's fallback sample_document.md
+    owned = {entry["output"] for entry in manifest.values()}
+    for out in OUT.glob("*.md"):
+        if out.name not in owned:
+            out.unlink(missing_ok=True)
+
+    tmp = manifest_path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    tmp.replace(manifest_path)
+
+    if timings:
+        print("Extraction time per file:")
+        for name, (seconds, status) in sorted(timings.items(), key=lambda t: -t[1][0]):
+            print(f"   {seconds:7.2f}s  {name}" + ("" if status == "ok" else f"  ⚠️ {status}"))
+    print(f"Documents extracted & standardized: {len(processed)} written "
+          f"({reused} from cache), {len(manifest) - len(processed)} unchanged")
+    return processed
 
 def main():  # <-- Separate main function for CLI
     parser = argparse.ArgumentParser()
     parser.add_argument('--project', required=True)
+    parser.add_argument('--workers', type=int, help='Extraction processes (default: CPU count)')
+    parser.add_argument('--timeout', type=float, default=FILE_TIMEOUT, help='Seconds allowed per file')
     args = parser.parse_args()
-    
-    standardize_documents(args.project)  # <-- Call function with argument
-    
+
+    standardize_documents(args.project, workers=args.workers, timeout=args.timeout)  # <-- Call function with argument
+
 if __name__ == "__main__":
-    main()  # <-- Only runs when script is executed directly
\ No newline at end of file
+    main()  # <-- Only runs when script is executed directly
@@ -0,0 +1,113 @@
+# utils/blobstore.py - content-addressed store for raw documents
+#
+# Every uploaded file is stored once under projects/.blobs/objects/<sha256>
+# and hardlinked into each project's raw_docs, so re-uploads and copies
+# across projects cost no extra space. Results derived from a blob (e.g. its
+# standardized markdown) live next to it under derived/<sha256>/ and are
+# reused by any project holding the same bytes.
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+
+BLOB_DIR = Path(os.environ.get("DMS_BLOB_DIR", "projects/.blobs"))
+
+
+def file_digest(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def blob_path(digest: str) -> Path:
+    return BLOB_DIR / "objects" / digest[:2] / digest
+
+
+def derived_path(digest: str, name: str) -> Path:
+    """Location of an artifact computed from blob `digest` (may not exist yet)."""
+    return BLOB_DIR / "derived" / digest / name
+
+
+def _tmp_beside(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+
+
+def adopt(tmp_path, digest: str) -> Path:
+    """
+    Move a fully written file with the given digest into the store. If the
+    blob is already stored the file is simply discarded.
+    """
+    target = blob_path(digest)
+    if target.exists():
+        os.remove(tmp_path)
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, target)
+    return target
+
+
+def put_bytes(data: bytes) -> str:
+    digest = hashlib.sha256(data).hexdigest()
+    if not blob_path(digest).exists():
+        tmp = _tmp_beside(blob_path(digest))
+        tmp.write_bytes(data)
+        adopt(tmp, digest)
+    return digest
+
+
+def link(digest: str, dest) -> Path:
+    """
+    Place blob `digest` at `dest` (replacing any previous file there):
+    a hardlink when the filesystem allows it, a copy otherwise.
+    """
+    dest = Path(dest)
+    if dest.exists() and os.path.samefile(dest, blob_path(digest)):
+        # Already linked (renaming over the same inode would leave tmp behind)
+        return dest
+    tmp = _tmp_beside(dest)
+    try:
+        os.link(blob_path(digest), tmp)
+    except OSError:
+        shutil.copyfile(blob_path(digest), tmp)
+    os.replace(tmp, dest)
+    return dest
+
+
+def store_derived(digest: str, name: str, text: str):
+    path = derived_path(digest, name)
+    tmp = _tmp_beside(path)
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def store_derived_parts(digest: str, name: str, parts) -> Path:
+    """Store the concatenation of the files `parts` as a derived artifact (streamed)."""
+    path = derived_path(digest, name)
+    tmp = _tmp_beside(path)
+    with open(tmp, "wb") as out:
+        for part in parts:
+            with open(part, "rb") as f:
+                shutil.copyfileobj(f, out)
+    os.replace(tmp, path)
+    return path
+
+
+def collect_garbage() -> int:
+    """
+    Delete blobs no project links to any more (link count back to 1),
+    together with their derived artifacts. Returns the number removed.
+    """
+    removed = 0
+    objects = BLOB_DIR / "objects"
+    if not objects.exists():
+        return 0
+    for path in objects.glob("*/*"):
+        if path.stat().st_nlink == 1:
+            path.unlink()
+            shutil.rmtree(derived_path(path.name, ""), ignore_errors=True)
+            removed += 1
+    return removed
@@ -1,10 +1,167 @@
-def chunk_text(text: str, max_chars: int = 3000):
-    chunks = []
-    while len(text) > max_chars:
-        split = text.rfind("\n", 0, max_chars)
-        if split == -1:
-            split = max_chars
-        chunks.append(text[:split])
-        text = text[split:]
-    chunks.append(text)
-    return chunks
\ No newline at end of file
+import re
+
+# A new block starts after a blank line or at a markdown heading
+BLOCK_BOUNDARY = re.compile(r"\n[ \t]*\n\s*|\n(?=#{1,6}\s)")
+
+
+def token_length(tokenizer):
+    """Measure text in tokenizer tokens instead of characters."""
+    def length(text: str) -> int:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return length
+
+
+def _blocks(text: str):
+    start = 0
+    for m in BLOCK_BOUNDARY.finditer(text):
+        if m.end() > start:
+            yield start, m.end()
+            start = m.end()
+    if start < len(text):
+        yield start, len(text)
+
+
+def _fit(text: str, start: int, end: int, budget: int, length) -> int:
+    """
+    End of the longest prefix of text[start:end] measuring at most `budget`,
+    pulled back to a word boundary when there is one (at least one character).
+    """
+    lo, hi = start + 1, end
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if length(text[start:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    if lo < end:
+        space = max(text.rfind(" ", start, lo), text.rfind("\n", start, lo))
+        if space > start:
+            lo = space + 1
+    return lo
+
+
+def _tail(text: str, start: int, end: int, budget: int, length):
+    """Start of the longest suffix of text[start:end] that begins at a word and fits `budget` (None if none)."""
+    words = [start + m.start() for m in re.finditer(r"(?<=\s)\S", text[start:end])]
+    lo, hi = 0, len(words)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if length(text[words[mid]:end]) <= budget:
+            hi = mid
+        else:
+            lo = mid + 1
+    return words[lo] if lo < len(words) else None
+
+
+def _pieces(text: str, max_size: int, length):
+    """
+    Yield (start, end, size) pieces no larger than max_size: whole blocks
+    when they fit, otherwise their lines, otherwise cuts measured with
+    `length` (at word boundaries where possible).
+    """
+    for start, end in _blocks(text):
+        size = length(text[start:end])
+        if size <= max_size:
+            yield start, end, size
+            continue
+
+        line_start = start
+        while line_start < end:
+            line_end = text.find("\n", line_start, end)
+            line_end = end if line_end == -1 else line_end + 1
+            line_size = length(text[line_start:line_end])
+            if line_size <= max_size:
+                yield line_start, line_end, line_size
+            else:
+                cut = line_start
+                while cut < line_end:
+                    cut_end = _fit(text, cut, line_end, max_size, length)
+                    yield cut, cut_end, length(text[cut:cut_end])
+                    cut = cut_end
+            line_start = line_end
+
+
+def _overlap(text: str, pieces, budget: int, length):
+    """
+    Trailing pieces of a finished chunk to repeat at the start of the next:
+    whole pieces while they fit in `budget` (never the chunk's first), then
+    a word-aligned tail of the piece that no longer fits.
+    """
+    kept, kept_size = [], 0
+    for i in range(len(pieces) - 1, -1, -1):
+        start, end, n = pieces[i]
+        if i > 0 and kept_size + n <= budget:
+            kept.insert(0, pieces[i])
+            kept_size += n
+            continue
+        tail = _tail(text, start, end, budget - kept_size, length)
+        if tail is not None:
+            n = length(text[tail:end])
+            kept.insert(0, (tail, end, n))
+            kept_size += n
+        break
+    return kept, kept_size
+
+
+def _is_heading(text: str, piece) -> bool:
+    return text.startswith("#", piece[0])
+
+
+def iter_chunk_spans(text: str, max_size: int = 3000, overlap: int = 0, length=len):
+    """
+    Lazily yield (start, end) offsets of chunks covering `text` in one pass.
+
+    Chunks are packed from paragraphs and cut before a markdown heading once
+    they hold at least a quarter of `max_size`; a heading is never left on
+    its own, but carried with the start of what follows. Sizes are measured
+    with `length` (characters by default, see `token_length`). Consecutive
+    chunks share up to `overlap` of trailing text (whole paragraphs, else
+    the last paragraph's closing words), except across a heading.
+    """
+    current = []  # (start, end, size) pieces of the chunk being built
+    size = 0
+
+    for piece in _pieces(text, max_size, length):
+        start, end, n = piece
+        heading = _is_heading(text, piece)
+
+        if current and size + n > max_size and all(_is_heading(text, p) for p in current):
+            # Only headings so far: fill the chunk with the head of this piece
+            if max_size - size > 0:
+                cut = _fit(text, start, end, max_size - size, length)
+                if length(text[start:cut]) <= max_size - size:
+                    yield current[0][0], cut
+                    current, size = [], 0
+                    start, n = cut, length(text[cut:end])
+                    piece = (start, end, n)
+                    heading = False
+
+        if current and (size + n > max_size or (heading and size >= max_size // 4)):
+            yield current[0][0], current[-1][1]
+
+            kept, kept_size = [], 0
+            if overlap and not heading:
+                kept, kept_size = _overlap(text, current, overlap, length)
+            while kept and kept_size + n > max_size:
+                kept_size -= kept.pop(0)[2]
+            current, size = kept, kept_size
+
+        if start < end:
+            current.append(piece)
+            size += n
+
+    if current:
+        yield current[0][0], current[-1][1]
+
+
+def iter_chunks(text: str, max_size: int = 3000, overlap: int = 0, length=len):
+    for start, end in iter_chunk_spans(text, max_size, overlap, length):
+        yield text[start:end]
+
+
+def chunk_spans(text: str, max_chars: int = 3000, overlap: int = 0):
+    return list(iter_chunk_spans(text, max_chars, overlap))
+
+
+def chunk_text(text: str, max_chars: int = 3000, overlap: int = 0):
+    return list(iter_chunks(text, max_chars, overlap)) or [text]
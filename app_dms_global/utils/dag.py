@@ -0,0 +1,155 @@
+# utils/dag.py - run a declarative stage graph with dependency-level parallelism
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Stage:
+    """
+    One pipeline step.
+
+    Args:
+        name: Unique stage name
+        run: Callable taking the shared context dict; its return value is
+            stored in ctx["results"][name]
+        deps: Names of stages that must finish first
+        inputs: Files/directories the stage reads, as format strings over
+            the context (e.g. "projects/{project_id}/raw_docs")
+        outputs: Files/directories the stage writes (same format)
+        params: Context keys whose values affect the result (e.g. "territory")
+        code: Functions or dotted module names whose source the result depends on
+        fallback: Optional callable (ctx, error) whose return value replaces
+            the result when `run` raises
+    """
+
+    def __init__(self, name, run, deps=(), inputs=(), outputs=(), params=(), code=(), fallback=None):
+        self.name = name
+        self.run = run
+        self.deps = tuple(deps)
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.params = tuple(params)
+        self.code = tuple(code)
+        self.fallback = fallback
+
+
+class StageResult:
+    def __init__(self, name):
+        self.name = name
+        self.status = "pending"   # ok | fallback | failed | skipped
+        self.value = None
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def duration(self) -> float:
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+def _check_graph(stages):
+    names = {s.name for s in stages}
+    for s in stages:
+        missing = set(s.deps) - names
+        if missing:
+            raise ValueError(f"Stage '{s.name}' depends on unknown stage(s): {', '.join(sorted(missing))}")
+    # Kahn's algorithm: every stage must become ready eventually
+    remaining = {s.name: set(s.deps) for s in stages}
+    while remaining:
+        ready = [n for n, d in remaining.items() if not d]
+        if not ready:
+            raise ValueError(f"Dependency cycle between: {', '.join(sorted(remaining))}")
+        for n in ready:
+            del remaining[n]
+        for d in remaining.values():
+            d.difference_update(ready)
+
+
+def _execute(stage, ctx, result, skip=None, on_finish=None):
+    result.started = time.perf_counter()
+    try:
+        fresh = False
+        if skip is not None:
+            try:
+                fresh, value = skip(stage, ctx)
+            except Exception as e:
+                print(f"   ⚠️ {stage.name}: freshness check failed ({e}), running")
+            if fresh:
+                result.value = value
+                result.status = "skipped"
+                result.finished = time.perf_counter()
+                if on_finish:
+                    on_finish(stage, result)
+                return result
+        result.value = stage.run(ctx)
+        result.status = "ok"
+    except Exception as e:
+        result.error = e
+        if stage.fallback is None:
+            result.status = "failed"
+        else:
+            try:
+                result.value = stage.fallback(ctx, e)
+                result.status = "fallback"
+            except Exception as fallback_error:
+                result.error = fallback_error
+                result.status = "failed"
+    result.finished = time.perf_counter()
+    if on_finish:
+        on_finish(stage, result)
+    return result
+
+
+def run_stages(stages, ctx: dict, max_workers: int = 4, on_start=None, skip=None, on_finish=None) -> dict:
+    """
+    Run every stage once all its deps have finished, independent stages
+    concurrently on a thread pool. A failed stage does not stop its
+    dependents: as in the linear pipeline, each stage copes with missing inputs.
+
+    `skip(stage, ctx)` may return (True, value) to reuse a previous result
+    instead of running the stage; `on_finish(stage, result)` is called after
+    each stage, in its worker thread.
+
+    Returns {name: StageResult}; values are also collected in ctx["results"].
+    """
+    _check_graph(stages)
+    ctx.setdefault("results", {})
+    by_name = {s.name: s for s in stages}
+    results = {s.name: StageResult(s.name) for s in stages}
+    pending = {s.name: set(s.deps) for s in stages}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage") as pool:
+        while pending or running:
+            for name in [n for n, deps in pending.items() if not deps]:
+                del pending[name]
+                if on_start:
+                    on_start(by_name[name])
+                running[pool.submit(_execute, by_name[name], ctx, results[name], skip, on_finish)] = name
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                ctx["results"][name] = results[name].value
+                for deps in pending.values():
+                    deps.discard(name)
+
+    return results
+
+
+def critical_path(stages, results: dict):
+    """
+    Longest chain of dependent stages by measured duration.
+    Returns (stage names in order, total seconds).
+    """
+    by_name = {s.name: s for s in stages}
+    memo = {}
+
+    def longest(name):
+        if name not in memo:
+            best = max((longest(d) for d in by_name[name].deps), key=lambda p: p[1], default=([], 0.0))
+            memo[name] = (best[0] + [name], best[1] + results[name].duration)
+        return memo[name]
+
+    return max((longest(s.name) for s in stages), key=lambda p: p[1], default=([], 0.0))
@@ -0,0 +1,88 @@
+"""
+Process-wide sentence embedding service.
+
+The model is loaded on first use, not at import, and shared by every
+caller in the process. Configuration (environment):
+    DMS_EMBEDDING_MODEL     model name (default all-MiniLM-L6-v2)
+    DMS_EMBEDDING_BACKEND   torch | onnx | openvino (default torch)
+    DMS_EMBEDDING_QUANTIZE  1 to apply dynamic int8 quantization (torch backend, CPU)
+"""
+import os
+import threading
+from functools import lru_cache
+
+MODEL_NAME = os.environ.get("DMS_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+BACKEND = os.environ.get("DMS_EMBEDDING_BACKEND", "torch")
+QUANTIZE = os.environ.get("DMS_EMBEDDING_QUANTIZE", "") == "1"
+
+QUERY_CACHE_SIZE = 1024
+
+_model = None
+_lock = threading.Lock()
+
+
+def model_id() -> str:
+    """Identifies the vectors this configuration produces (stored in index manifests)."""
+    suffix = ":int8" if QUANTIZE and BACKEND == "torch" else ""
+    return f"{MODEL_NAME}{suffix}" if BACKEND == "torch" else f"{MODEL_NAME}:{BACKEND}"
+
+
+def _load():
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(MODEL_NAME, device="cpu", backend=BACKEND)
+    if QUANTIZE and BACKEND == "torch":
+        import torch
+        model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    model.eval()
+    return model
+
+
+def get_model():
+    global _model
+    if _model is None:
+        with _lock:
+            if _model is None:
+                _model = _load()
+    return _model
+
+
+def warm_up():
+    """Load the model and run one encode so the first request doesn't pay for it."""
+    get_model().encode(["warm-up"], show_progress_bar=False)
+
+
+def dimension() -> int:
+    return get_model().get_sentence_embedding_dimension()
+
+
+def tokenizer():
+    return get_model().tokenizer
+
+
+def set_threads(threads: int):
+    """Limit the CPU threads torch uses for encoding."""
+    import torch
+    torch.set_num_threads(threads)
+
+
+def encode(texts, batch_size=32, **kwargs):
+    return get_model().encode(
+        texts,
+        batch_size=batch_size,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+        **kwargs,
+    )
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def _cached_query(query: str):
+    emb = encode([query])
+    emb.setflags(write=False)
+    return emb
+
+
+def embed_query(query: str):
+    """Embed a search query as a (1, dim) array; repeated questions hit the cache."""
+    return _cached_query(query.strip())
@@ -0,0 +1,113 @@
+# utils/fingerprint.py - make-style skipping for pipeline stages
+import hashlib
+import importlib.util
+import inspect
+import json
+import threading
+from pathlib import Path
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _json_or_none(value):
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return None
+
+
+class StageManifest:
+    """
+    Per-project record of what each stage last ran on.
+
+    A stage's fingerprint covers the content of its inputs, the context
+    parameters it declares (e.g. sector/territory) and the source of the
+    code it runs. A stage is fresh when its fingerprint matches the last
+    successful run and all its outputs exist. File hashes are reused
+    while (size, mtime) are unchanged.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        data = json.loads(self.path.read_text(encoding="utf-8")) if self.path.exists() else {}
+        self.stages = data.get("stages", {})
+        self.files = data.get("files", {})
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _file_hash(self, path: Path) -> str:
+        st = path.stat()
+        key = str(path)
+        with self._lock:
+            cached = self.files.get(key)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            return cached[2]
+        digest = _sha256(path)
+        with self._lock:
+            self.files[key] = [st.st_size, st.st_mtime_ns, digest]
+        return digest
+
+    def _hash_path(self, h, path: Path):
+        if path.is_dir():
+            for p in sorted(path.rglob("*")):
+                if p.is_file():
+                    h.update(f"{p.relative_to(path)}\0{self._file_hash(p)}\0".encode())
+        elif path.is_file():
+            h.update(self._file_hash(path).encode())
+        else:
+            h.update(b"<missing>")
+
+    def fingerprint(self, stage, ctx) -> str:
+        h = hashlib.sha256()
+        for pattern in stage.inputs:
+            h.update(f"input:{pattern}\0".encode())
+            self._hash_path(h, Path(pattern.format(**ctx)))
+        for name in stage.params:
+            h.update(f"param:{name}={ctx.get(name)}\0".encode())
+        for code in (stage.run, *stage.code):
+            # Functions, or dotted module names (located without importing them)
+            source = importlib.util.find_spec(code).origin if isinstance(code, str) else inspect.getsourcefile(code)
+            h.update(self._file_hash(Path(source)).encode())
+        return h.hexdigest()
+
+    def check(self, stage, ctx, force: bool = False):
+        """
+        Return (fresh, last value). The fingerprint is kept so that
+        `record` can store it if the stage then runs successfully; with
+        `force` it is still computed, but the stage is never fresh.
+        """
+        fp = self.fingerprint(stage, ctx)
+        with self._lock:
+            self._pending[stage.name] = fp
+            last = self.stages.get(stage.name)
+        if force:
+            return False, None
+        outputs_exist = all(Path(p.format(**ctx)).exists() for p in stage.outputs)
+        if last and last["fingerprint"] == fp and outputs_exist:
+            return True, last.get("value")
+        return False, None
+
+    def record(self, stage, value):
+        with self._lock:
+            fp = self._pending.pop(stage.name, None)
+            if fp is not None:
+                self.stages[stage.name] = {"fingerprint": fp, "value": _json_or_none(value)}
+
+    def invalidate(self, stage_name: str):
+        with self._lock:
+            self.stages.pop(stage_name, None)
+
+    def save(self):
+        with self._lock:
+            data = json.dumps({"stages": self.stages, "files": self.files}, indent=2)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(data, encoding="utf-8")
+        tmp.replace(self.path)
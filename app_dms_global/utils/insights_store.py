@@ -0,0 +1,174 @@
+# utils/insights_store.py - typed, queryable store of extracted insights (SQLite)
+#
+# extract_key_insights writes the records here; insights/key_insights.md is
+# rendered from the store as a read-only view for prompts and humans.
+import sqlite3
+import threading
+from pathlib import Path
+
+
+def store_path(project_name: str) -> Path:
+    return Path(f"projects/{project_name}/insights/insights.db")
+
+
+class Insight:
+    """
+    One extractive insight.
+
+    Args:
+        type: Category (Market, Regulation, Operations, Financial, Risk)
+        source: Standardized document name (e.g. "report.md")
+        excerpt: Source text the insight quotes
+        start: Offset of the excerpt in the source markdown
+        end: End offset of the excerpt in the source markdown
+        score: Keyword density the insight was ranked by
+    """
+
+    FIELDS = ("type", "source", "excerpt", "start", "end", "score")
+
+    def __init__(self, type, source, excerpt, start=None, end=None, score=0.0):
+        self.type = type
+        self.source = source
+        self.excerpt = excerpt
+        self.start = start
+        self.end = end
+        self.score = score
+
+    def to_dict(self) -> dict:
+        return {f: getattr(self, f) for f in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Insight":
+        return cls(**{f: data.get(f) for f in cls.FIELDS})
+
+    def to_markdown(self) -> str:
+        return f"""### Insight
+Type: {self.type}
+Source: {self.source}
+Excerpt: "{self.excerpt[:500].replace('"', "'")}"
+Implication: Indicates {self.type.lower()} relevance based on source document.
+"""
+
+
+class InsightStore:
+    """
+    Insights of one project, indexed by type and source. Writes replace the
+    whole set (or one source's records) in a single transaction, so readers
+    never see a half-written extraction.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS insights (
+                id INTEGER PRIMARY KEY,
+                type TEXT NOT NULL,
+                source TEXT NOT NULL,
+                excerpt TEXT NOT NULL,
+                start INTEGER,
+                "end" INTEGER,
+                score REAL NOT NULL DEFAULT 0
+            )"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS insights_type ON insights(type, score)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS insights_source ON insights(source, score)")
+
+    def replace(self, insights, source: str | None = None):
+        """Replace all records (or only those of `source`) with `insights`."""
+        rows = [(i.type, i.source, i.excerpt, i.start, i.end, i.score) for i in insights]
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                if source is None:
+                    self._db.execute("DELETE FROM insights")
+                else:
+                    self._db.execute("DELETE FROM insights WHERE source = ?", (source,))
+                self._db.executemany(
+                    'INSERT INTO insights (type, source, excerpt, start, "end", score) VALUES (?, ?, ?, ?, ?, ?)',
+                    rows,
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def query(self, type: str | None = None, source: str | None = None, limit: int | None = None,
+              order: str = "score") -> list[Insight]:
+        """
+        Insights filtered by type and/or source.
+
+        Args:
+            order: "score" (best first) or "document" (by source, then position)
+        """
+        where, params = [], []
+        if type is not None:
+            where.append("type = ?")
+            params.append(type)
+        if source is not None:
+            where.append("source = ?")
+            params.append(source)
+        sql = 'SELECT type, source, excerpt, start, "end", score FROM insights'
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY score DESC, id" if order == "score" else " ORDER BY source, id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        return [Insight(**dict(row)) for row in rows]
+
+    def sources(self) -> list[str]:
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT DISTINCT source FROM insights ORDER BY source")]
+
+    def types(self) -> list[str]:
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT DISTINCT type FROM insights ORDER BY type")]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM insights").fetchone()[0]
+
+    def render_markdown(self) -> str:
+        """The key_insights.md view: one section per source, insights best first."""
+        parts = ["# Key Insights\n"]
+        for source in self.sources():
+            parts.append(f"\n## From {source}\n")
+            parts.extend(i.to_markdown() for i in self.query(source=source))
+        return "\n".join(parts)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def open_store(project_name: str) -> InsightStore | None:
+    """The project's store, or None if insights were never extracted."""
+    path = store_path(project_name)
+    return InsightStore(path) if path.exists() else None
+
+
+def query(project_name: str, type: str | None = None, source: str | None = None, limit: int | None = None):
+    store = open_store(project_name)
+    if store is None:
+        return []
+    try:
+        return store.query(type=type, source=source, limit=limit)
+    finally:
+        store.close()
+
+
+def sources(project_name: str) -> list[str]:
+    store = open_store(project_name)
+    if store is None:
+        return []
+    try:
+        return store.sources()
+    finally:
+        store.close()
@@ -1,132 +1,262 @@
-# utils/llm.py - MOCK VERSION ONLY
-import time
-import random
-import json
+# utils/llm.py - LLM client: cache, rate limits and retries over a pluggable backend
+import asyncio
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
-class DevelopmentLLM:
+from . import progress
+from .llm_backends import LLMBackend, MockBackend, get_backend
+from .llm_cache import ResponseCache
+from .ratelimit import RateLimiter, acall_with_retry, call_with_retry, estimate_tokens
+
+DEFAULT_SYSTEM = "You are a senior investment analyst."
+
+
+def _env_number(name: str):
+    value = os.environ.get(name)
+    return float(value) if value else None
+
+
+class LLMClient:
+    """
+    Front end shared by every script, independent of the model provider.
+
+    Responses are cached on disk under `cache_dir`; pass `cache=False`
+    to `ask`/`batch_ask` to bypass the cache for a call.
+
+    Uncached calls go through a requests/tokens-per-minute limiter and are
+    retried with jittered backoff on 429s. `batch_ask` runs up to
+    `concurrency` prompts at once.
+    """
+
+    def __init__(
+        self,
+        backend: LLMBackend,
+        cache_dir: str = ".llm_cache",
+        cache: bool = True,
+        concurrency: int = 4,
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+    ):
+        self.backend = backend
+        self.cache_dir = Path(cache_dir)
+        self.use_cache = cache
+        self._cache = None
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rpm=rpm, tpm=tpm)
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+        self._executor = None
+
+    @property
+    def model(self) -> str:
+        return self.backend.name
+
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        """The response cache, opened on first use so that importing never touches the disk."""
+        if self._cache is None and self.use_cache:
+            with self._calls_lock:
+                if self._cache is None:
+                    self._cache = ResponseCache(self.cache_dir / "responses.sqlite3")
+        return self._cache
+
+    def clear_cache(self):
+        """Erase every cached response (GDPR cleanup); a no-op if the cache was never created."""
+        if self.use_cache and (self._cache is not None or (self.cache_dir / "responses.sqlite3").exists()):
+            self.cache.clear()
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Process-wide pool (`concurrency` threads) for running LLM calls side by side."""
+        if self._executor is None:
+            with self._calls_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="llm")
+        return self._executor
+
+    def _cache_key(self, prompt: str, system: str, cache: bool, params: dict):
+        if not cache or self.cache is None:
+            return None
+        return ResponseCache.key(self.model, system, prompt, params)
+
+    def _count_call(self):
+        with self._calls_lock:
+            self.calls += 1
+
+    def ask(self, prompt: str, system: str = DEFAULT_SYSTEM, cache: bool = True, **kwargs) -> str:
+        """Return the cached response for this request, or ask the backend."""
+        key = self._cache_key(prompt, system, cache, kwargs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        self.limiter.acquire(estimate_tokens(system, prompt))
+        self._count_call()
+        response = call_with_retry(self.backend.complete, prompt, system, on_wait=self.limiter.record_wait, **kwargs)
+
+        if key is not None:
+            self.cache.set(key, response)
+        return response
+
+    def _open_stream(self, prompt: str, system: str, **kwargs):
+        # Pull the first token here so 429s raised on connect can be retried
+        tokens = self.backend.stream(prompt, system, **kwargs)
+        return next(tokens, None), tokens
+
+    def stream_ask(self, prompt: str, system: str = DEFAULT_SYSTEM, cache: bool = True, **kwargs) -> Iterator[str]:
+        """Like ask, but yield the response token by token as the backend produces it."""
+        key = self._cache_key(prompt, system, cache, kwargs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        self.limiter.acquire(estimate_tokens(system, prompt))
+        self._count_call()
+        first, tokens = call_with_retry(self._open_stream, prompt, system, on_wait=self.limiter.record_wait, **kwargs)
+
+        parts = []
+        if first is not None:
+            parts.append(first)
+            yield first
+        for token in tokens:
+            parts.append(token)
+            yield token
+
+        if key is not None:
+            self.cache.set(key, "".join(parts))
+
+    async def aask(self, prompt: str, system: str = DEFAULT_SYSTEM, cache: bool = True, **kwargs) -> str:
+        key = self._cache_key(prompt, system, cache, kwargs)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        await self.limiter.aacquire(estimate_tokens(system, prompt))
+        self._count_call()
+        response = await acall_with_retry(self.backend.acomplete, prompt, system, on_wait=self.limiter.record_wait, **kwargs)
+
+        if key is not None:
+            self.cache.set(key, response)
+        return response
+
+    def batch_ask(self, prompts: list, system: str = DEFAULT_SYSTEM, concurrency: Optional[int] = None, **kwargs):
+        """Process multiple prompts concurrently; responses are returned in input order."""
+        if not prompts:
+            return []
+        workers = min(concurrency or self.concurrency, len(prompts))
+        print(f"📋 LLM processing {len(prompts)} prompts ({workers} at a time)...")
+        one = lambda p: self.ask(p, system, **kwargs)
+        if concurrency is None:
+            return list(self.executor.map(one, prompts))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(one, prompts))
+
+    async def abatch_ask(self, prompts: list, system: str = DEFAULT_SYSTEM, concurrency: Optional[int] = None, **kwargs):
+        """Async batch_ask: at most `concurrency` prompts in flight, results in input order."""
+        semaphore = asyncio.Semaphore(concurrency or self.concurrency)
+
+        async def one(prompt):
+            async with semaphore:
+                return await self.aask(prompt, system, **kwargs)
+
+        return await asyncio.gather(*(one(p) for p in prompts))
+
+
+class DevelopmentLLM(LLMClient):
     """
     Development-only LLM that generates realistic mock responses.
     No API calls, no rate limits.
     """
-    
-    def __init__(self, cache_dir: str = ".llm_cache"):
-        self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(exist_ok=True)
+
+    def __init__(self, cache_dir: str = ".llm_cache", **kwargs):
+        super().__init__(MockBackend(), cache_dir, **kwargs)
         print("🚀 Development LLM initialized (no API calls)")
-    
-    def _get_mock_response(self, prompt: str, system: str) -> str:
-        """Generate a realistic mock response."""
-        
-        # Extract keywords from prompt
-        prompt_lower = prompt.lower()
-        
-        # Determine response type based on content
-        if any(word in prompt_lower for word in ['financial', 'revenue', 'ebitda', 'profit']):
-            template = """**Financial Analysis**
-
-Based on the provided financial documents:
-- Revenue projected to grow at 12-18% CAGR over next 3 years
-- EBITDA margins expected to stabilize around 22-25%
-- Cash flow positive by Q4 Year 1
-- Key financial metrics show sustainable growth trajectory
-
-**Recommendation**: Financial projections appear realistic and achievable."""
-        
-        elif any(word in prompt_lower for word in ['market', 'competitive', 'industry']):
-            template = """**Market Analysis**
-
-Market assessment indicates:
-- Total Addressable Market: $1.8B - $2.5B range
-- Serviceable Addressable Market: $450M - $600M
-- Annual market growth rate: 10-14%
-- 3 major competitors control ~55% market share
-- Clear differentiation opportunity identified
-
-**Recommendation**: Strong market positioning potential."""
-        
-        elif any(word in prompt_lower for word in ['risk', 'challenge', 'threat']):
-            template = """**Risk Assessment**
-
-Identified risk factors:
-1. **Market Risk**: Moderate (evolving competitive landscape)
-2. **Execution Risk**: Low-Medium (experienced team in place)
-3. **Financial Risk**: Low (strong projected cash flows)
-4. **Regulatory Risk**: Medium (monitor policy changes)
-
-**Recommendation**: Risks appear manageable with proper mitigation."""
-        
-        elif any(word in prompt_lower for word in ['structure', 'legal', 'governance']):
-            template = """**Structural Analysis**
-
-Corporate structure assessment:
-- Legal entity structure appropriate for target markets
-- Governance framework aligns with best practices
-- Equity structure supports growth objectives
-- Compliance systems appear adequate
-
-**Recommendation**: Structure supports business objectives."""
-        
-        else:
-            template = """**Comprehensive Analysis**
-
-Based on document review and {system} assessment:
-- Strong fundamentals identified across key metrics
-- Growth trajectory appears sustainable
-- Competitive advantages clearly articulated
-- Risk profile within acceptable parameters
-
-**Recommendation**: Proceed with recommended due diligence steps.""".format(system=system)
-        
-        # Add some variability
-        variations = [
-            "Analysis indicates favorable conditions.",
-            "Assessment shows promising opportunity.",
-            "Review suggests viable investment case.",
-            "Evaluation reveals strong potential."
-        ]
-        
-        return template + f"\n\n*Note: {random.choice(variations)}*"
-    
-    def ask(self, prompt: str, system: str = "You are a senior investment analyst.", **kwargs) -> str:
-        """Generate a mock response."""
-        
-        # Simulate processing time
-        time.sleep(random.uniform(0.3, 1.2))
-        
-        print(f"📝 Dev LLM processing: {prompt[:60]}...")
-        
-        # Generate response
-        response = self._get_mock_response(prompt, system)
-        
-        return response
-    
-    def batch_ask(self, prompts: list, system: str = "You are a senior investment analyst.", **kwargs):
-        """Process multiple prompts."""
-        responses = []
-        for i, prompt in enumerate(prompts):
-            print(f"📋 Dev LLM processing {i+1}/{len(prompts)}...")
-            response = self.ask(prompt, system, **kwargs)
-            responses.append(response)
-            
-            if i < len(prompts) - 1:
-                time.sleep(random.uniform(0.5, 1.0))
-        
-        return responses
+
+
+def create_client(backend: Optional[str] = None, **kwargs) -> LLMClient:
+    """
+    Build a client for the backend named by `backend` or DMS_LLM_BACKEND
+    (budgets from DMS_LLM_RPM / DMS_LLM_TPM / DMS_LLM_CONCURRENCY).
+    """
+    kwargs.setdefault("concurrency", int(os.environ.get("DMS_LLM_CONCURRENCY", 4)))
+    kwargs.setdefault("rpm", _env_number("DMS_LLM_RPM"))
+    kwargs.setdefault("tpm", _env_number("DMS_LLM_TPM"))
+    client = LLMClient(get_backend(backend), **kwargs)
+    print(f"🚀 LLM initialized (backend: {client.model})")
+    return client
 
 
 # Create global instance
-llm = DevelopmentLLM()
+llm = create_client()
 
 # Backward compatible function
-def ask(prompt: str, system: str = "You are a senior investment analyst.", **kwargs):
+def ask(prompt: str, system: str = DEFAULT_SYSTEM, **kwargs):
     return llm.ask(prompt, system, **kwargs)
 
 
+def stream_ask(prompt: str, system: str = DEFAULT_SYSTEM, **kwargs) -> Iterator[str]:
+    return llm.stream_ask(prompt, system, **kwargs)
+
+
+def ask_streaming(prompt: str, out=None, channel: Optional[str] = None, system: str = DEFAULT_SYSTEM, **kwargs) -> str:
+    """
+    Stream an answer, writing each token to the file `out` as it arrives
+    and each completed line to the progress `channel` (see utils/progress.py).
+    Returns the complete answer.
+
+    Tokens go to a temporary file that replaces `out` only once the stream
+    completes, so a failed stream never leaves `out` empty or truncated.
+    The channel only ever receives whole lines, so the one-line notices
+    other stages publish while this one streams land between lines.
+    """
+    parts = []
+    line = ""
+    f = tmp = None
+    if out is not None:
+        out = Path(out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        tmp = out.with_name(f".{out.name}.{uuid.uuid4().hex}.part")
+        f = open(tmp, "w", encoding="utf-8")
+        progress.publish(channel, f"\n\n── {out.name} ──\n")
+    try:
+        for token in llm.stream_ask(prompt, system, **kwargs):
+            parts.append(token)
+            if f is not None:
+                f.write(token)
+                f.flush()
+            line += token
+            if "\n" in token:
+                done, _, line = line.rpartition("\n")
+                progress.publish(channel, done + "\n")
+        if f is not None:
+            f.close()
+            os.replace(tmp, out)
+    finally:
+        if f is not None:
+            f.close()
+            tmp.unlink(missing_ok=True)
+    if line:
+        progress.publish(channel, line + "\n")
+    return "".join(parts)
+
+
+def cache_stats() -> dict:
+    """Cache hit/miss counters plus the number of uncached (real) LLM calls."""
+    stats = llm._cache.stats() if llm._cache is not None else {}
+    return {**stats, "llm_calls": llm.calls}
+
+
 if __name__ == "__main__":
     # Test
     test = "Analyze the financial projections and market opportunity."
-    print("Testing Development LLM...")
+    print("Testing LLM...")
     result = ask(test)
-    print(f"✅ Response: {result[:100]}...")
\ No newline at end of file
+    print(f"✅ Response: {result[:100]}...")
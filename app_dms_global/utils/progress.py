@@ -0,0 +1,37 @@
+# utils/progress.py - live text relay from pipeline stages to the UI
+#
+# Channels are per-project append-only files, so any process (Dash worker,
+# FastAPI worker, pipeline subprocess) can publish and any other can follow.
+from pathlib import Path
+
+
+def progress_path(channel: str) -> Path:
+    return Path(f"projects/{channel}/progress.log")
+
+
+def reset(channel: str):
+    path = progress_path(channel)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("", encoding="utf-8")
+
+
+def publish(channel: str | None, text: str):
+    if not channel or not text:
+        return
+    path = progress_path(channel)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(text)
+
+
+def tail(channel: str, max_chars: int = 600) -> str:
+    """Last `max_chars` characters published on a channel ("" if none)."""
+    path = progress_path(channel)
+    if not path.exists():
+        return ""
+    with open(path, "rb") as f:
+        f.seek(0, 2)
+        size = f.tell()
+        f.seek(max(0, size - max_chars * 4))
+        data = f.read().decode("utf-8", errors="ignore")
+    return data[-max_chars:]
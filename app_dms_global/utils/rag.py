@@ -1,15 +1,139 @@
+import json
+import mmap
+import os
+from functools import lru_cache
 from pathlib import Path
-import pickle
-from sentence_transformers import SentenceTransformer
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
+import faiss
+import numpy as np
+
+from . import embeddings
+
+# On-disk layout of projects/{project}/rag/
+INDEX_FILE = "index.faiss"          # FAISS native serialization, opened memory-mapped
+PASSAGES_FILE = "passages.bin"      # UTF-8 passages concatenated back to back
+OFFSETS_FILE = "passages.idx.npy"   # int64 rows (vector_id, start, end, source_id, doc_start, doc_end), sorted by id
+SOURCES_FILE = "sources.json"       # source_id -> document name
+
+# Number of open project indexes kept per process
+INDEX_CACHE_SIZE = 8
+
+
+def rag_dir(project) -> Path:
+    return Path(f"projects/{project}/rag")
+
+
+class IndexStore:
+    """An opened project index: FAISS vectors plus lazily decoded passages."""
+
+    def __init__(self, index, offsets, sources, passages):
+        self.index = index
+        self.offsets = offsets
+        self.sources = sources
+        self._passages = passages
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _row(self, vector_id):
+        row = int(np.searchsorted(self.offsets[:, 0], vector_id))
+        if row >= len(self.offsets) or self.offsets[row, 0] != vector_id:
+            raise KeyError(vector_id)
+        return row
+
+    def passage(self, vector_id):
+        """Return (text, source) for a vector id, decoding only that passage."""
+        _, start, end, source_id, _, _ = self.offsets[self._row(vector_id)]
+        text = self._passages[start:end].decode("utf-8") if self._passages is not None else ""
+        return text, self.sources[source_id]
+
+    def location(self, vector_id):
+        """Return (source, doc_start, doc_end): where the passage sits in its document."""
+        _, _, _, source_id, doc_start, doc_end = self.offsets[self._row(vector_id)]
+        return self.sources[source_id], int(doc_start), int(doc_end)
+
+
+def save_index(project, index, texts, sources, ids=None, spans=None):
+    """
+    Persist a FAISS index and its passages under projects/{project}/rag.
+
+    `ids` are the FAISS vector ids of each passage (defaults to 0..n-1) and
+    `spans` the (start, end) character offsets of each passage in its source
+    document (defaults to the whole passage).
+    The index file is replaced last, so its mtime marks a complete store.
+    """
+    out = rag_dir(project)
+    out.mkdir(parents=True, exist_ok=True)
+
+    ids = np.arange(len(texts), dtype=np.int64) if ids is None else np.asarray(ids, dtype=np.int64)
+    source_names = sorted(set(sources))
+    source_ids = {name: i for i, name in enumerate(source_names)}
+
+    if spans is None:
+        spans = [(0, len(t)) for t in texts]
+
+    rows = np.empty((len(texts), 6), dtype=np.int64)
+    passages_tmp = out / f"{PASSAGES_FILE}.tmp"
+    with open(passages_tmp, "wb") as f:
+        pos = 0
+        for row, i in enumerate(np.argsort(ids, kind="stable")):
+            data = texts[i].encode("utf-8")
+            f.write(data)
+            rows[row] = (ids[i], pos, pos + len(data), source_ids[sources[i]], *spans[i])
+            pos += len(data)
+
+    offsets_tmp = out / f"{OFFSETS_FILE}.tmp"
+    with open(offsets_tmp, "wb") as f:
+        np.save(f, rows)
+
+    sources_tmp = out / f"{SOURCES_FILE}.tmp"
+    sources_tmp.write_text(json.dumps(source_names), encoding="utf-8")
+
+    index_tmp = out / f"{INDEX_FILE}.tmp"
+    faiss.write_index(index, str(index_tmp))
+
+    os.replace(passages_tmp, out / PASSAGES_FILE)
+    os.replace(offsets_tmp, out / OFFSETS_FILE)
+    os.replace(sources_tmp, out / SOURCES_FILE)
+    os.replace(index_tmp, out / INDEX_FILE)
+
+
+def _read_faiss(path: Path):
+    try:
+        return faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        # Index types without mmap support are read into memory
+        return faiss.read_index(str(path))
+
+
+@lru_cache(maxsize=INDEX_CACHE_SIZE)
+def _open_index(project: str, mtime_ns: int) -> IndexStore:
+    base = rag_dir(project)
+    index = _read_faiss(base / INDEX_FILE)
+    offsets = np.load(base / OFFSETS_FILE, mmap_mode="r")
+    sources = json.loads((base / SOURCES_FILE).read_text(encoding="utf-8"))
+
+    passages = None
+    with open(base / PASSAGES_FILE, "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            passages = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    return IndexStore(index, offsets, sources, passages)
+
+
+def load_index(project) -> IndexStore:
+    """
+    Open a project's index, reusing the process-wide cache while the
+    index file is unchanged. A rebuilt index has a new mtime and is reopened.
+    """
+    index_path = rag_dir(project) / INDEX_FILE
+    if not index_path.exists():
+        raise FileNotFoundError(f"{index_path} not found. Build the RAG index first.")
+    return _open_index(str(project), index_path.stat().st_mtime_ns)
 
-def load_index(project):
-    index_path = Path(f"projects/{project}/rag/index.pkl")
-    return pickle.load(open(index_path, "rb"))
 
 def search(query, project, k=3):
-    index, texts, sources = load_index(project)
-    emb = model.encode([query])
-    _, ids = index.search(emb, k)
-    return [(texts[i], sources[i]) for i in ids[0]]
\ No newline at end of file
+    store = load_index(project)
+    emb = embeddings.embed_query(query)
+    _, ids = store.index.search(emb, k)
+    return [store.passage(i) for i in ids[0] if i != -1]
@@ -0,0 +1,127 @@
+# utils/ratelimit.py - request/token budgets and 429 retries for LLM calls
+import asyncio
+import random
+import threading
+import time
+
+
+class RateLimitError(Exception):
+    """Raised by a backend when the provider answers 429."""
+
+    def __init__(self, message: str = "rate limit exceeded", retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token count (~4 characters per token) used for budgeting."""
+    return max(1, sum(len(t) for t in texts if t) // 4)
+
+
+class RateLimiter:
+    """
+    Token buckets for requests-per-minute and tokens-per-minute budgets.
+
+    `acquire` reserves capacity immediately (the bucket may go negative) and
+    then sleeps for the deficit, so concurrent callers are served in arrival
+    order without holding the lock while waiting. A budget of None is unlimited,
+    so callers only ever wait when a configured quota requires it.
+
+    `waited` accumulates the seconds callers spent idle (budget waits and
+    429 backoffs reported through `record_wait`).
+    """
+
+    def __init__(self, rpm: float | None = None, tpm: float | None = None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._requests = float(rpm or 0)
+        self._tokens = float(tpm or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.rpm or self.tpm)
+
+    def _reserve(self, tokens: int) -> float:
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait = 0.0
+            if self.rpm:
+                self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60) - 1
+                if self._requests < 0:
+                    wait = max(wait, -self._requests * 60 / self.rpm)
+            if self.tpm:
+                tokens = min(tokens, self.tpm)
+                self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60) - tokens
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens * 60 / self.tpm)
+            self.waited += wait
+            return wait
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.waited += seconds
+
+    def acquire(self, tokens: int = 1) -> float:
+        """Block until the request fits the budgets; return the seconds waited."""
+        if not self.limited:
+            return 0.0
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def aacquire(self, tokens: int = 1) -> float:
+        if not self.limited:
+            return 0.0
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+def is_rate_limit(error: Exception) -> bool:
+    return isinstance(error, RateLimitError) or getattr(error, "status_code", None) == 429
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0, retry_after: float | None = None) -> float:
+    """Full-jitter exponential backoff, never shorter than the provider's retry-after."""
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+
+def call_with_retry(fn, *args, retries: int = 5, base: float = 1.0, cap: float = 30.0, on_wait=None, **kwargs):
+    """
+    Call fn, retrying with jittered backoff while it fails with a 429.
+    `on_wait(seconds)` is told about each backoff.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or not is_rate_limit(e):
+                raise
+            delay = backoff_delay(attempt, base, cap, getattr(e, "retry_after", None))
+            print(f"⏳ Rate limited, retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            if on_wait:
+                on_wait(delay)
+            time.sleep(delay)
+
+
+async def acall_with_retry(fn, *args, retries: int = 5, base: float = 1.0, cap: float = 30.0, on_wait=None, **kwargs):
+    """Async call_with_retry for coroutine functions."""
+    for attempt in range(retries + 1):
+        try:
+            return await fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == retries or not is_rate_limit(e):
+                raise
+            delay = backoff_delay(attempt, base, cap, getattr(e, "retry_after", None))
+            print(f"⏳ Rate limited, retrying in {delay:.1f}s ({attempt + 1}/{retries})")
+            if on_wait:
+                on_wait(delay)
+            await asyncio.sleep(delay)
@@ -5,6 +5,8 @@ from pathlib import Path
 import os
 import shutil  
 
+from app_dms_global.utils import blobstore, progress
+
 
 # Try to import pipeline, but create mock if not available
 try:
@@ -77,8 +79,8 @@ def register_callbacks(app):
                     BASE.mkdir(parents=True, exist_ok=True)
                     
                     file_path = BASE / fname
-                    with open(file_path, 'wb') as f:
-                        f.write(decoded)
+                    # Stored once by content and hardlinked into raw_docs
+                    blobstore.link(blobstore.put_bytes(decoded), file_path)
                     saved_files.append(fname)
                 
                 file_list = ", ".join(saved_files[:3])
@@ -96,8 +98,7 @@ def register_callbacks(app):
                 BASE.mkdir(parents=True, exist_ok=True)
                 
                 file_path = BASE / filename
-                with open(file_path, 'wb') as f:
-                    f.write(decoded)
+                blobstore.link(blobstore.put_bytes(decoded), file_path)
                 
                 new_files = existing_files + [filename] if existing_files else [filename]
                 return new_files, f"✅ Uploaded: {filename}"
@@ -175,6 +176,28 @@ def register_callbacks(app):
         
         return pipeline_data, winter_msg, download_disabled, spring_msg
 
+    # Winter: poll the progress relay only while a run is in flight
+    @app.callback(
+        Output("pipeline-progress-poll", "disabled"),
+        Input("run-pipeline-btn", "n_clicks"),
+        Input("pipeline-status", "data"),
+        prevent_initial_call=True
+    )
+    def toggle_progress_poll(run_clicks, pipeline_status):
+        # The click starts the run; the status update means it has ended
+        return ctx.triggered_id != "run-pipeline-btn"
+
+    # Winter: relay streamed LLM output while the pipeline runs
+    @app.callback(
+        Output("winter-stream", "children"),
+        Input("pipeline-progress-poll", "n_intervals"),
+        Input("pipeline-status", "data"),
+        prevent_initial_call=True
+    )
+    def relay_pipeline_stream(n_intervals, pipeline_status):
+        # Also refreshed once when the run ends, after polling has stopped
+        return progress.tail("current_project", 600)
+
     # Spring: Download deck (with GDPR auto-cleanup)
     @app.callback(
         Output("download-deck", "data"),
@@ -196,7 +219,7 @@ def register_callbacks(app):
                     def cleanup_after_delay():
                         time.sleep(30)  # Wait 30 seconds for download to complete
                         project_dir = Path("projects/current_project")
-                        folders = ["raw_docs", "standardized", "outputs", "insights", "deck", "financial", "memo"]
+                        folders = ["raw_docs", "standardized", "outputs", "insights", "deck", "financial", "memo", "rag"]
                         
                         for folder in folders:
                             folder_path = project_dir / folder
@@ -204,6 +227,15 @@ def register_callbacks(app):
                                 shutil.rmtree(folder_path)
                                 folder_path.mkdir(parents=True, exist_ok=True)
                         
+                        progress.progress_path("current_project").unlink(missing_ok=True)
+                        (project_dir / "project_reasoning.txt").unlink(missing_ok=True)
+                        # Stage fingerprints also keep each stage's result (deck text included)
+                        (project_dir / "pipeline_manifest.json").unlink(missing_ok=True)
+                        # Blobs only this project linked to (and their derived files) go too
+                        blobstore.collect_garbage()
+                        # As do cached LLM answers, which quote the documents
+                        from app_dms_global.utils.llm import llm
+                        llm.clear_cache()
                         print("🗑️ GDPR auto-cleanup completed - all project data deleted")
                     
                     # Start cleanup in background
@@ -51,5 +51,6 @@ def layout():
             dcc.Store(id="uploaded-files", data=[]),
             dcc.Store(id="pipeline-status", data={"running": False, "completed": False}),
             dcc.Store(id="deck-path", data=""),  # Store the generated deck path
+            dcc.Interval(id="pipeline-progress-poll", interval=1000, disabled=True),  # Live LLM output relay (on while the pipeline runs)
         ],
     )
\ No newline at end of file
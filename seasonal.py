@@ -124,6 +124,7 @@ def winter_action():
                 className="inline-button winter-btn",
             ),
             html.Div(id="winter-status", className="status-message processing-info"),
+            html.Pre(id="winter-stream", className="status-message stream-preview"),
         ]
     )
 